@@ -66,8 +66,8 @@ for d in $INPUT/*; do
                 export APP=vortex-run
                 echo "Running: python3 ./launch.py -f $(realpath $f) -p /vx/ -o $(realpath $RES_DIR)/ --cpus 15 --lock_on_first"
                 python3 ./launch.py -f $(realpath $f) -p /vx/ -o $(realpath $RES_DIR)/ --cpus 15 --lock_on_first
-                echo "Running: python3 ./extract.py -m vortex-run -o $(realpath $RES_DIR)/"
-                python3 ./extract.py -m vortex-run -o $(realpath $RES_DIR)/
+                echo "Running: python3 ./extract.py -m vortex-run -o $(realpath $RES_DIR)/ --incremental"
+                python3 ./extract.py -m vortex-run -o $(realpath $RES_DIR)/ --incremental
             fi
         done
     fi
@@ -0,0 +1,75 @@
+import sys
+import time
+import random
+
+from toolkit.data_analysis import vortex_da_utils as vda
+
+"""
+Micro-benchmark of the Vortex PERF report parsers on synthetic reports.
+Every report has the aggregated PERF lines and the per-core ones of a 4 cores configuration.
+The baseline is a frozen copy of the token parser used before the precompiled patterns.
+Usage: python3 bench-perf-parsing.py [reports]
+"""
+
+REPORTS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+CORES = 4
+
+FIELDS = [  "instrs={}, cycles={}, IPC=0.{}", "ibuffer stalls={}", "scoreboard stalls={}", "alu unit stalls={}",
+            "lsu unit stalls={}", "csr unit stalls={}", "fpu unit stalls={}", "gpu unit stalls={}", "loads={}",
+            "stores={}", "branches={}", "icache reads={}", "icache read misses={} (hit ratio={}%)", "dcache reads={}",
+            "dcache writes={}", "dcache read misses={} (hit ratio={}%)", "dcache write misses={} (hit ratio={}%)",
+            "dcache bank stalls={} (utilization={}%)", "dcache mshr stalls={}", "smem reads={}", "smem writes={}",
+            "smem bank stalls={} (utilization={}%)", "memory requests={} (reads={}, writes={})", "memory average latency={} cycles"]
+
+def make_report(rnd):
+    lines = ["running: make -C ./ci/../tests/opencl/vecadd run-simx"]
+    for c in range(CORES):
+        for f in FIELDS:
+            f = f.replace("icache read misses", "icache misses").replace("memory average latency", "memory latency")
+            lines.append("PERF: core{}: ".format(c) + f.format(*(rnd.randint(0, 99999) for _ in range(3))))
+    for f in FIELDS: lines.append("PERF: " + f.format(*(rnd.randint(0, 99999) for _ in range(3))))
+    return "\n".join(lines) + "\n"
+
+def old_parser(lines):
+    """Former vda.gen_dict_from_lines (token by token, per-core lines skipped), kept as the baseline."""
+    d = dict((k,None) for k in vda.log_info)
+    for l in lines:
+        l = l.strip()
+        if "PERF:" in l:
+            if " core" in l: continue #Not implemented yet
+            else:
+                split_l = l.split(" ")[1:] #I remove the PERF [1:]
+                k = []
+                k_prec = []
+                for sl in (vda.remove_c_from_s("(),",ssl) for ssl in split_l): #I clean the string from (),
+                    k.append(sl.split('=')[0])
+                    if "=" in sl:
+                        k = '_'.join(k)
+                        if sl.split('=')[1][-1] == '%': #percentage cases
+                            k = "_".join(k_prec.split("_")[:-1]) + "_" + k
+                            if k in vda.log_info: d[k] = vda.digit(sl.split("=")[1][:-1]) #I remove the % from the string
+                            else: print("Unknown key found:{}".format(k))
+                        else:
+                            if k in vda.log_info: d[k] = vda.digit(sl.split("=")[1])
+                            else: print("Unknown key found:{}".format(k))
+                        k_prec = k
+                        k=[]
+    return d
+
+def bench(name, func, reports):
+    start = time.perf_counter()
+    for r in reports: func(r)
+    elapsed = time.perf_counter() - start
+    print("{:<40} {:>8.2f} s {:>10.0f} reports/s".format(name, elapsed, len(reports) / elapsed))
+    return elapsed
+
+rnd = random.Random(0)
+templates = [make_report(rnd) for _ in range(1000)]
+reports = [templates[i % len(templates)] for i in range(REPORTS)]
+for r in templates: assert old_parser(r.splitlines()) == vda.parse_perf_text(r)
+print("{} reports, {} PERF lines each".format(REPORTS, len(FIELDS) * (CORES + 1)))
+
+old = bench("token parser (aggregated lines only)", lambda r: old_parser(r.splitlines()), reports)
+new = bench("parse_perf_text", vda.parse_perf_text, reports)
+print("speedup: {:.1f}x".format(old / new))
+bench("parse_perf_text + per-core rows", lambda r: vda.parse_perf_text(r, cores=True), reports)
@@ -0,0 +1,46 @@
+import sys
+import time
+
+import pandas as pd
+
+from toolkit.stream_parsing import VortexTraceAnalysisClass as VTA
+
+"""
+Micro-benchmark of the Vortex DEBUG/TRACE line decoders.
+Lines are rebuilt from the trace sample in inputs/tests/trace_analysis and repeated to get stable timings.
+Usage: python3 bench-trace-parsing.py [repetitions]
+"""
+
+SAMPLE = "./inputs/tests/trace_analysis/raw/test_trace.feather"
+REPETITIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+def make_lines(df):
+    fetch, trace = [], []
+    for r in df.to_dict("records"):
+        tmask = str(r["tmask"]).zfill(4)
+        PC = "0x{:x}".format(r["PC"])
+        tail = "coreid={}, wid={}, PC={}, ex=ALU, tmask={}, (#{})\n".format(r["core"], r["warp"], PC, tmask, r["eID"])
+        fetch.append("DEBUG warp.cpp:62: Fetch: coreid={}, wid={}, tmask={}, PC={} (#{})\n".format(r["core"], r["warp"], tmask, PC, r["eID"]))
+        trace.append("TRACE {}: pipeline-schedule: {}".format(r["schedule-stmp"], tail))
+        trace.append("TRACE {}: pipeline-commit: {}".format(r["schedule-stmp"] + r["total-exec-time"], tail))
+    return fetch, trace
+
+def bench(name, func, lines):
+    start = time.perf_counter()
+    for _ in range(REPETITIONS):
+        for l in lines: func(l)
+    elapsed = time.perf_counter() - start
+    rate = REPETITIONS * len(lines) / elapsed
+    print("{:<30} {:>12.0f} lines/s".format(name, rate))
+    return rate
+
+fetch, trace = make_lines(pd.read_feather(SAMPLE))
+for l in fetch: assert VTA.decode_fetch_line(l) == VTA.get_instr_dict(l.split()[2:])
+print("{} fetch + {} trace lines, x{}".format(len(fetch), len(trace), REPETITIONS))
+
+old = bench("Fetch: get_instr_dict", lambda l: VTA.get_instr_dict(l.split()[2:]), fetch)
+new = bench("Fetch: decode_fetch_line", VTA.decode_fetch_line, fetch)
+print("speedup: {:.1f}x".format(new / old))
+old = bench("TRACE: get_trace_line_dict", VTA.get_trace_line_dict, trace)
+new = bench("TRACE: decode_trace_line", VTA.decode_trace_line, trace)
+print("speedup: {:.1f}x".format(new / old))
@@ -4,6 +4,7 @@ from toolkit.util.parsers import extractor as parsers
 parser = parsers.ExtractorParserClass()
 extractor = da.extractorsDict[parser.args.mode](    parser.args.output_dir, 
                                                     parser.args.app, 
-                                                    yml_file=parser.args.yml_file)
+                                                    yml_file=parser.args.yml_file,
+                                                    n_workers=parser.args.workers)
 
-extractor.extract()
+extractor.extract(incremental=parser.args.incremental, partition_by=parser.args.partition_by)
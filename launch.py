@@ -1,5 +1,7 @@
 import os
+import sys
 import time
+import signal
 import traceback
 import multiprocessing.pool as mpp
 from multiprocessing import Manager
@@ -26,7 +28,14 @@ def experiment_task(ID, parser, lock):
         command = book.make_command(ID, e, parser.meta_dict)
         with cd(launcher_path):
             if APP=="vortex-run"    : ret = cmd(command, shell=True, check=False)
-            elif APP=="vortex-tan"  : ret = stream_parsing.VortexTraceAnalysisClass(exp=e, output_file=e.make_result_fname()).run()
+            elif APP=="vortex-tan"  : ret = stream_parsing.VortexTraceAnalysisClass(exp=e, output_file=e.make_result_fname(),
+                                                                                        timeout=parser.args.trace_timeout,
+                                                                                        idle_timeout=parser.args.trace_idle_timeout,
+                                                                                        batch_size=parser.args.trace_batch_size,
+                                                                                        max_pending_rows=parser.args.trace_max_pending_rows,
+                                                                                        n_workers=parser.args.trace_workers,
+                                                                                        capture=parser.args.trace_capture,
+                                                                                        compression=parser.args.trace_log_compression).run()
         book.commit(ID, ret, lock)
         return 0
     except Exception as e:
@@ -51,15 +60,21 @@ else:                                       workers = parser.args.cpus if parser
 print("Actual number of workers: {}".format(workers))
 print("Starting the experiments...")
 FIRST_ITER = True
-with Manager() as manager:
-    lock = manager.Lock()
-    with mpp.ThreadPool(workers) as pool:
-        for i in parser.exp_book.get_missing_IDs(parser.args.oID):
-            _ = pool.apply_async(experiment_task, args=(i, parser, lock))
-            while( FIRST_ITER and (not parser.exp_book.check_status(ID=i)) and parser.args.lock_on_first): time.sleep(2) # Lock on the first experiment to finish to get the code compiled
-            #if r.get(): exit(1)
-            FIRST_ITER = False
-            time.sleep(0.1)
-        pool.close()
-        pool.join()
+signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum)) # unwind like Ctrl-C
+try:
+    with Manager() as manager:
+        lock = manager.Lock()
+        with mpp.ThreadPool(workers) as pool:
+            for i in parser.exp_book.get_missing_IDs(parser.args.oID):
+                _ = pool.apply_async(experiment_task, args=(i, parser, lock))
+                while( FIRST_ITER and (not parser.exp_book.check_status(ID=i)) and parser.args.lock_on_first): time.sleep(2) # Lock on the first experiment to finish to get the code compiled
+                #if r.get(): exit(1)
+                FIRST_ITER = False
+                time.sleep(0.1)
+            pool.close()
+            pool.join()
+except BaseException:
+    # the simulators run in their own sessions, Ctrl-C/SIGTERM of the launcher doesn't reach them
+    stream_parsing.abort_running_commands()
+    raise
 print("All experiments finished!")
\ No newline at end of file
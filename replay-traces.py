@@ -0,0 +1,19 @@
+import os
+
+from toolkit import stream_parsing
+from toolkit.util.parsers import replay as parsers
+
+"""
+Rebuilds the trace .feather files from saved simx logs, without re-running the simulations.
+Each <result name>.log is rebuilt into <result name>.feather, the trace read by the vortex-tan extraction.
+Usage: python3 replay-traces.py -i <log or directory> [-j workers] [-o output (single log)]
+"""
+
+parser = parsers.ReplayParserClass()
+trace_args = {"batch_size" : parser.args.trace_batch_size, "max_pending_rows" : parser.args.trace_max_pending_rows}
+if parser.args.output:
+    results = [stream_parsing.replay_trace_log(parser.args.input, output_file=os.path.abspath(parser.args.output), **trace_args)]
+else:
+    results = stream_parsing.replay_trace_logs(parser.args.input, n_workers=parser.args.workers, **trace_args)
+for log, ret in results:
+    print("{}: {}".format(log, "done" if ret == 0 else "failed ({})".format(ret)))
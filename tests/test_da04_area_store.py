@@ -0,0 +1,62 @@
+from toolkit.data_analysis import area_store as ast
+
+import pandas as pd
+
+def make_rpt(tmp_path, name, scale):
+    """Core with two lanes of ALUs (one ALU nested in another ALU) and a cache."""
+    rpt = tmp_path / (name + ".rpt")
+    rows = [(0, "top",   "",       1.0),
+            (1, "core0", "Core",   0.6),
+            (2, "lane0", "Lane",   0.2),
+            (3, "alu",   "ALU",    0.1),
+            (4, "alu2",  "ALU",    0.05),
+            (2, "lane1", "Lane",   0.2),
+            (3, "alu",   "ALU",    0.1),
+            (2, "cache", "Cache",  0.2),
+            (1, "cache", "Cache",  0.4)]
+    lines = ["Report : area\n", "-" * 40 + "\n"]
+    for depth, inst, mod, area in rows:
+        a = area * scale
+        fields = [inst] + ([mod] if mod else []) + ["10", str(a / 2), str(a / 2), str(a)]
+        lines.append("  " * depth + " ".join(fields) + "\n")
+    rpt.write_text("".join(lines))
+    return str(rpt)
+
+def make_store(tmp_path):
+    store = ast.AreaStoreClass()
+    reports = {"w{}".format(w) : (make_rpt(tmp_path, "w{}".format(w), w), {"warps" : w}) for w in [1, 2, 4]}
+    store.add_reports(reports, n_workers=2)
+    return store
+
+class TestClass_AreaStore():
+
+    def test_index(self, tmp_path):
+        store = make_store(tmp_path)
+        assert list(store.df.index.names) == ["report", "path", "module"]
+        assert store.df.loc[("w2", "top/core0/lane1/alu", "ALU"), "total_area"] == 0.2
+        assert len(store.df) == 27
+
+    def test_rollup(self, tmp_path):
+        store = make_store(tmp_path)
+        ret = store.rollup("ALU")
+        # the nested ALU is counted once, inside its parent
+        assert ret["warps"].tolist() == [1, 2, 4]
+        assert ret["total_area"].round(6).tolist() == [0.2, 0.4, 0.8]
+        ret = store.rollup("Cache", under="core0")
+        assert ret["total_area"].round(6).tolist() == [0.2, 0.4, 0.8]
+        assert store.rollup("Cache")["total_area"].round(6).tolist() == [0.6, 1.2, 2.4]
+        assert store.rollup("FPU")["total_area"].tolist() == [0.0, 0.0, 0.0]
+
+    def test_drilldown(self, tmp_path):
+        store = make_store(tmp_path)
+        ret = store.drilldown("Core").set_index("report")
+        assert sorted(c for c in ret.columns if c != "warps") == ["Cache", "Lane"]
+        assert ret.loc["w4", "Lane"].round(6) == 1.6
+        ret = store.drilldown("top", levels=2).set_index("report")
+        assert ret.loc["w1", "Lane"].round(6) == 0.4
+
+    def test_save_load(self, tmp_path):
+        store = make_store(tmp_path)
+        store.save(str(tmp_path / "store"))
+        loaded = ast.AreaStoreClass.load(str(tmp_path / "store"))
+        pd.testing.assert_frame_equal(loaded.rollup("ALU"), store.rollup("ALU"))
@@ -0,0 +1,141 @@
+import toolkit.data_analysis as da
+import toolkit.util.os_utils as osu
+
+import os
+import pandas as pd
+
+INPUT_ARCHIVE = './tests/inputs/vortex-perf-extraction-class-test-input'
+EXP_DIR = 'scripts/outputs/IISWC-COMP-vecadd/'
+
+def extract(tmp_path, n_workers):
+    osu.cmd('tar -xzf {} -C {}'.format(INPUT_ARCHIVE, tmp_path))
+    path = os.path.join(str(tmp_path), EXP_DIR)
+    extractor = da.VortexPerfExtractionClass(path=path, app='test', n_workers=n_workers)
+    extractor.extract()
+    return pd.read_feather(path + 'dataframe.feather'), extractor
+
+class TestClass_ParallelExtraction():
+
+    def test_workers_match_serial(self, tmp_path):
+        (tmp_path / "serial").mkdir()
+        (tmp_path / "parallel").mkdir()
+        serial, _ = extract(tmp_path / "serial", 1)
+        parallel, extractor = extract(tmp_path / "parallel", 3)
+        assert len(parallel) == len(extractor.file_list)
+        pd.testing.assert_frame_equal(parallel, serial)
+
+    def test_incremental_extraction(self, tmp_path):
+        osu.cmd('tar -xzf {} -C {}'.format(INPUT_ARCHIVE, tmp_path))
+        path = os.path.join(str(tmp_path), EXP_DIR)
+        full = da.VortexPerfExtractionClass(path=path, app='test')
+        full.extract(incremental=True)
+        ref = pd.read_feather(path + 'dataframe.feather')
+        manifest = pd.read_feather(path + 'dataframe.manifest.feather')
+        assert len(manifest) == len(full.file_list) and manifest["row_stop"].iloc[-1] == len(ref)
+
+        # touch one report and remove another: only the touched one is extracted again
+        changed, removed = sorted(full.file_list)[:2]
+        with open(changed, "a") as f: f.write("\n")
+        os.remove(removed)
+        extractor = da.VortexPerfExtractionClass(path=path, app='test')
+        processed = []
+        extract_file = extractor.extract_file
+        extractor.extract_file = lambda f: processed.append(f) or extract_file(f)
+        extractor.extract(incremental=True)
+        assert processed == [changed]
+        # extracted columns only, the checkpoint columns are updated by the first extraction
+        cols = ["ID"] + da.vda.log_info
+        df = pd.read_feather(path + 'dataframe.feather')[cols]
+        removed_ID = int(os.path.basename(removed).split("_")[0])
+        expected = ref[ref["ID"] != removed_ID][cols]
+        pd.testing.assert_frame_equal(df.sort_values(by="ID").reset_index(drop=True),
+                                      expected.sort_values(by="ID").reset_index(drop=True))
+
+    def test_incremental_skips_faulty_reports(self, tmp_path):
+        osu.cmd('tar -xzf {} -C {}'.format(INPUT_ARCHIVE, tmp_path))
+        path = os.path.join(str(tmp_path), EXP_DIR)
+        faulty = os.path.join(path, 'raw', '9999_faulty.txt')
+        with open(faulty, "w") as f: f.write("PERF: instrs=10, cycles=20\nINVALID EXPERIMENT\n")
+        first = da.VortexPerfExtractionClass(path=path, app='test')
+        first.extract(incremental=True)
+        manifest = pd.read_feather(path + 'dataframe.manifest.feather').set_index("path")
+        assert manifest.loc[faulty, "fault"] != 0 and manifest.loc[faulty, "row_start"] == manifest.loc[faulty, "row_stop"]
+        assert (manifest.drop(faulty)["fault"] == 0).all()
+        extracted_mtime = os.stat(path + 'dataframe.extracted.feather').st_mtime_ns
+
+        # nothing changed: no report is read again, the extracted rows are not rewritten
+        extractor = da.VortexPerfExtractionClass(path=path, app='test')
+        processed = []
+        extract_file = extractor.extract_file
+        extractor.extract_file = lambda f: processed.append(f) or extract_file(f)
+        extractor.extract(incremental=True)
+        assert processed == []
+        assert os.stat(path + 'dataframe.extracted.feather').st_mtime_ns == extracted_mtime
+
+        # a fixed report is extracted again
+        os.remove(faulty)
+        osu.cmd('cp {} {}'.format(sorted(first.file_list)[1], faulty))
+        extractor = da.VortexPerfExtractionClass(path=path, app='test')
+        processed = []
+        extract_file = extractor.extract_file
+        extractor.extract_file = lambda f: processed.append(f) or extract_file(f)
+        extractor.extract(incremental=True)
+        assert processed == [faulty]
+
+    def test_fused_report_reader(self, tmp_path):
+        osu.cmd('tar -xzf {} -C {}'.format(INPUT_ARCHIVE, tmp_path))
+        raw = os.path.join(str(tmp_path), EXP_DIR, 'raw')
+        files = sorted(os.path.join(raw, f) for f in os.listdir(raw))
+        faulty = tmp_path / "0_faulty.txt"
+        faulty.write_text("PERF: instrs=10, cycles=20\nINVALID EXPERIMENT\n")
+        for f in files + [str(faulty)]:
+            r, metrics = da.vda.read_report(f)
+            assert r == da.VortexPerfExtractionClass.check_faults_by_string(f)
+            if not r: assert metrics == da.vda.gen_dict_from_logfile(f)
+
+    def test_perf_line_parser(self):
+        lines = ["PERF: instrs=70686, cycles=116158, IPC=0.608533\n",
+                 "PERF: icache read misses=198 (hit ratio=99%)\n",
+                 "PERF: memory requests=9505 (reads=5336, writes=4169)\n",
+                 "PERF: memory average latency=4 cycles\n",
+                 "PERF: core1: icache misses=194 (hit ratio=89%)\n",
+                 "PERF: core1: memory latency=16 cycles\n"]
+        metrics, cores = da.vda.parse_perf_text("".join(lines), cores=True)
+        assert metrics == da.vda.gen_dict_from_lines(lines)
+        assert (metrics["instrs"], metrics["IPC"], metrics["icache_read_hit_ratio"]) == (70686, 0.608533, 99)
+        assert (metrics["reads"], metrics["writes"], metrics["memory_average_latency"]) == (5336, 4169, 4)
+        cores = da.vda.gen_core_df(cores, ID=7)
+        assert cores.values.tolist() == [[7, 1, "icache_misses", 194.0], [7, 1, "icache_hit_ratio", 89.0], [7, 1, "memory_latency", 16.0]]
+
+    def test_core_metrics(self, tmp_path):
+        (tmp_path / "serial").mkdir()
+        (tmp_path / "parallel").mkdir()
+        df, extractor = extract(tmp_path / "serial", 1)
+        _, parallel = extract(tmp_path / "parallel", 3)
+        cores = pd.read_feather(extractor.core_dataframe_path)
+        assert list(cores.columns) == ["ID", "core", "metric", "value"]
+        pd.testing.assert_frame_equal(pd.read_feather(parallel.core_dataframe_path), cores)
+        # the per-core instructions sum up to the aggregated ones
+        instrs = cores[cores["metric"] == "instrs"].groupby("ID")["value"].sum()
+        ref = df.set_index("ID").loc[instrs.index, "instrs"]
+        assert (instrs.to_numpy() == ref.to_numpy()).all()
+
+    def test_partitioned_extraction(self, tmp_path):
+        (tmp_path / "flat").mkdir()
+        (tmp_path / "partitioned").mkdir()
+        ref, _ = extract(tmp_path / "flat", 1)
+        osu.cmd('tar -xzf {} -C {}'.format(INPUT_ARCHIVE, tmp_path / "partitioned"))
+        path = os.path.join(str(tmp_path / "partitioned"), EXP_DIR)
+        extractor = da.VortexPerfExtractionClass(path=path, app='test')
+        extractor.batch_rows = 50
+        extractor.extract(partition_by=["app", "cores", "warps"])
+        assert extractor.df.empty and len(extractor.dataset_schemas) > 1
+        assert os.path.isdir(os.path.join(path, "dataset", "app=vecadd", "cores=4", "warps=2"))
+        # the consolidated view has the same rows (ordered by partition) and columns
+        df = pd.read_feather(path + 'dataframe.feather')
+        cols = ["ID"] + da.vda.log_info + ["app", "cores", "warps", "threads"]
+        pd.testing.assert_frame_equal(df[cols].sort_values(by="ID").reset_index(drop=True),
+                                      ref[cols].sort_values(by="ID").reset_index(drop=True))
+        # a single partition is read without the rest of the sweep
+        part = pd.read_parquet(os.path.join(path, "dataset"), filters=[("cores", "=", 4), ("warps", "=", 2)])
+        assert len(part) == len(ref[(ref["cores"] == 4) & (ref["warps"] == 2)])
@@ -0,0 +1,38 @@
+import toolkit.data_analysis as da
+import toolkit.util.os_utils as osu
+
+import os
+import pandas as pd
+
+INPUT_ARCHIVE = './tests/inputs/vortex-perf-extraction-class-test-input'
+EXP_DIR = 'scripts/outputs/IISWC-COMP-vecadd/'
+
+class TestClass_FnameDecoding():
+
+    def test_listing_matches_checkpoint(self, tmp_path):
+        osu.cmd('tar -xzf {} -C {}'.format(INPUT_ARCHIVE, tmp_path))
+        path = os.path.join(str(tmp_path), EXP_DIR)
+        df = da.vda.gen_df_from_fnames(os.listdir(path + 'raw'), 'vecadd')
+        checkpoint = pd.read_feather(path + 'checkpoint.feather')
+        cols = [c for c in df.columns if c in checkpoint.columns]
+        assert len(cols) > 5
+        merged = pd.merge(df[cols], checkpoint[cols], on="ID", suffixes=("", "_checkpoint"))
+        assert len(merged) == len(df) == len(checkpoint)
+        for c in cols[1:]:
+            assert df[c].dtype == checkpoint[c].dtype
+            assert (merged[c] == merged[c + "_checkpoint"]).all()
+
+    def test_optional_keys_and_flags(self):
+        names = ["raw/1_gcnSynth_simx_C1_c2_w4_t8_l2_AGGR_cora_INTER_hs16_bs-1_lw0",
+                 "2_gcnSynth_simx_C1_c2_w4_t8_AGGR_cora_INTER_hs16_bs-1_lw0",
+                 "README.txt"]
+        df = da.vda.gen_df_from_fnames(names, 'gcnSynth')
+        assert df["ID"].tolist() == [1, 2]
+        assert df["l2cache"].tolist() == [True, False] and not df["l3cache"].any()
+        assert df["batch_size"].tolist() == [-1, -1] and df["dataset"].tolist() == ["cora", "cora"]
+
+    def test_custom_template(self):
+        template = {"ID" : '{ID}', "app" : '{app}', "ratio" : 'r{ratio}', "groups" : 'hw{groups}'}
+        df = da.vda.gen_df_from_fnames(["0_a_r0.5_hw2", "1_a_r1"], template=template)
+        assert df["ratio"].tolist() == [0.5, 1.0]
+        assert df["groups"].dtype == "Int64" and df["groups"].isna().tolist() == [False, True]
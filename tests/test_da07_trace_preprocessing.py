@@ -0,0 +1,217 @@
+import toolkit.data_analysis as da
+import toolkit.stream_parsing as sp
+import toolkit.util.os_utils as osu
+from toolkit.data_analysis import utils
+
+import os
+import yaml
+import multiprocessing as mp
+import pytest
+import numpy as np
+import pandas as pd
+
+SECTIONS = './tests/inputs/vortex-trace-analysis-class-test/sections.yml'
+
+def reference_label(code_sections, pc, base=0x80000000):
+    """First section (file order) listing the PC, as the former address by address lookup table."""
+    if pc < base: return "fini"
+    for s, entries in code_sections.items():
+        for e in entries:
+            if type(e) == int and e == pc: return s
+            if type(e) == list and pc in e: return s
+            if type(e) == str:
+                start, end = (int(x, base=16) for x in e.split(":"))
+                if start <= pc <= end and (pc - start) % 4 == 0: return s
+    return "fini"
+
+class TestClass_CodeMap():
+
+    def test_sections_file(self):
+        code_map = da.VortexTraceAnalysisClass.gen_code_map(SECTIONS)
+        code_sections = yaml.load(open(SECTIONS, "r"), Loader=yaml.FullLoader)
+        pcs = np.arange(0x7ffffff0, 0x80000060)
+        assert code_map.label(pcs).tolist() == [reference_label(code_sections, p) for p in pcs]
+        assert da.VortexTraceAnalysisClass.gen_code_map("not-a-file.yml") == {}
+
+    def test_overlapping_sections(self):
+        code_sections = {   "a" : ["80000000:80000020", 0x80000003],
+                            "b" : ["80000010:80000040", [0x80000002, 0x80000004]],
+                            "c" : ["7ffffff0:80000008"]}
+        pcs = np.arange(0x7fffffe0, 0x80000050)
+        labels = utils.CodeMapClass(code_sections).label(pcs)
+        assert labels.tolist() == [reference_label(code_sections, p) for p in pcs]
+
+class TestClass_ReferenceCode():
+
+    def test_dump_workers_config(self, tmp_path, monkeypatch):
+        os.makedirs(tmp_path / "raw")
+        dumps = {}
+        for k in ["k0", "k1"]:
+            dumps[k] = str(tmp_path / (k + ".dump"))
+            open(dumps[k], "w").close()
+        calls = []
+        monkeypatch.setattr(sp, "parse_dump_files", lambda files, output_path, n_workers: calls.append(n_workers))
+        analysis = da.VortexTraceAnalysisClass(path=str(tmp_path) + "/", app="vecadd", n_workers=4)
+        analysis.configs.update({"kernel_key" : "kernel", "dotdump_path" : dumps})
+        analysis.gen_ref_code_df()
+        analysis.configs["dump_workers"] = 2
+        analysis.gen_ref_code_df()
+        assert calls == [0, 2] # not the n_workers of the extraction pool
+
+class TestClass_ThreadMasks():
+
+    def test_popcount_matches_printed_masks(self):
+        rng = np.random.default_rng(0)
+        printed = ["".join(rng.choice(["0", "1"], 32)) for _ in range(200)]
+        bits = utils.tmask_to_bits(printed)
+        assert bits.dtype == np.uint64
+        assert (bits == np.array([int(m, base=2) for m in printed], dtype=np.uint64)).all()
+        assert utils.popcount(bits).tolist() == [m.count("1") for m in printed]
+        # integer columns (new traces) are taken as they are
+        assert (utils.tmask_to_bits(pd.Series(bits)) == bits).all()
+
+    def test_legacy_integer_masks(self):
+        # printed masks read back as decimal integers by the former trace parser
+        df = pd.read_feather('./inputs/tests/trace_analysis/raw/test_trace.feather')
+        assert df["tmask"].dtype == np.int64
+        assert da.VortexTraceAnalysisClass.is_legacy_trace(df)
+        expected = [str(m).count("1") for m in df["tmask"]]
+        assert utils.popcount(utils.tmask_to_bits(df["tmask"], legacy=True)).tolist() == expected
+        assert utils.popcount(utils.tmask_to_bits(pd.Series([11, 1, 111, 1111]), legacy=True)).tolist() == [2, 1, 3, 4]
+        assert da.VortexTraceAnalysisClass.get_exec_count(df.iloc[0], legacy=True) == expected[0]
+        with pytest.raises(ValueError): utils.tmask_to_bits(pd.Series([3, 7]), legacy=True)
+
+    def test_numeric_masks(self):
+        # signed bitmasks are not guessed as legacy masks: 10 is 0b1010
+        tmask = pd.Series([10, 1, 11, 0], dtype=np.int64)
+        assert utils.tmask_to_bits(tmask).tolist() == [10, 1, 11, 0]
+        assert utils.popcount(utils.tmask_to_bits(tmask)).tolist() == [2, 1, 3, 0]
+        assert not da.VortexTraceAnalysisClass.is_legacy_trace(pd.DataFrame({"tmask" : tmask.astype(np.uint64)}))
+        # uint64 column turned float by an outer merge
+        left = pd.DataFrame({"eID" : [0, 1, 2], "tmask" : np.array([15, 3, 8], dtype=np.uint64)})
+        merged = pd.merge(left, pd.DataFrame({"eID" : [1, 2, 3]}), on="eID", how="outer")
+        assert merged["tmask"].dtype.kind == "f"
+        bits = utils.tmask_to_bits(merged["tmask"])
+        assert bits.dtype == np.uint64
+        assert bits.tolist() == [15, 3, 8, 0]
+        assert utils.popcount(bits).tolist() == [4, 2, 1, 0]
+
+    def test_lane_utilization(self):
+        tmask = pd.Series([0b0001, 0b0011, 0b1111, 0b0001], dtype=np.uint64)
+        assert utils.lane_utilization(tmask).tolist() == [1.0, 0.5, 0.25, 0.25]
+        assert utils.lane_utilization(["0001", "0011"], n_lanes=8).tolist() == [1.0, 0.5] + [0.0] * 6
+        df = pd.DataFrame({"section" : ["a", "a", "b"], "tmask" : pd.Series([1, 3, 2], dtype=np.uint64)})
+        per_section = df.groupby("section")["tmask"].apply(utils.lane_utilization, n_lanes=2)
+        assert per_section.loc["a"].tolist() == [1.0, 0.5] and per_section.loc["b"].tolist() == [0.0, 1.0]
+
+class TestClass_TimeSeriesSynthesis():
+
+    @staticmethod
+    def fold(events):
+        ts = utils.TimeSeriesClass("ts", events=events.copy(), period_col_name="total-exec-time", start_col_name="schedule-stmp")
+        ts.events = ts.events.sort_values(by="schedule-stmp")
+        ts.events.reset_index(drop=True, inplace=True)
+        return ts.fold_events()
+
+    def test_matches_event_by_event_fold(self):
+        rng = np.random.default_rng(0)
+        for t in range(500):
+            n = int(rng.integers(1, 40))
+            events = pd.DataFrame({ "schedule-stmp"     : rng.integers(0, 3 * n, n).astype(float),
+                                    "total-exec-time"   : rng.integers(1, 20, n).astype(float if t % 3 else int),
+                                    "e_count"           : rng.integers(0, 5, n)})
+            if t % 2: events["PC-id"] = "x" # object rows
+            ts = utils.TimeSeriesClass("ts", events=events.copy(), period_col_name="total-exec-time", start_col_name="schedule-stmp")
+            pd.testing.assert_frame_equal(ts.make_synthesis(), self.fold(events), check_exact=True)
+
+    def test_empty_events(self):
+        events = pd.DataFrame({"schedule-stmp" : [4.0, 0.0, 2.0], "total-exec-time" : [1.0, 0.0, 3.0], "e_count" : [1, 2, 3]})
+        ts = utils.TimeSeriesClass("ts", events=events.copy(), period_col_name="total-exec-time", start_col_name="schedule-stmp")
+        pd.testing.assert_frame_equal(ts.make_synthesis(), self.fold(events))
+
+class TestClass_GroupSynthesis():
+
+    @staticmethod
+    def reference_synthesis(df, over):
+        """Former core by section loop, each group filtered out of the full frame."""
+        synthesis_df = pd.DataFrame({})
+        for c in list(df["core"].unique()):
+            for s in list(df[over].unique()):
+                child_df = df.loc[(df["core"]==c) & (df[over]==s)]
+                if child_df.empty: continue
+                events = utils.TimeSeriesClass( ID="{}_{}".format(c,s), events=child_df,
+                                                period_col_name="total-exec-time", start_col_name="schedule-stmp").make_synthesis()
+                events["core"] = [c]*len(events)
+                events[over] = [s]*len(events)
+                synthesis_df = pd.concat([synthesis_df, events], ignore_index=True)
+        return synthesis_df
+
+    def test_matches_nested_loops(self):
+        rng = np.random.default_rng(0)
+        n = 3000
+        df = pd.DataFrame({ "core"              : rng.integers(0, 4, n),
+                            "func"              : rng.choice(["main", "kernel", "fini", None], n),
+                            "schedule-stmp"     : np.sort(rng.integers(0, 5 * n, n)).astype(float),
+                            "total-exec-time"   : rng.integers(1, 20, n).astype(float),
+                            "e_count"           : rng.integers(0, 5, n)})
+        expected = self.reference_synthesis(df, "func")
+        pd.testing.assert_frame_equal(da.VortexTraceAnalysisClass.synthesize_groups(df, "func"), expected)
+        pd.testing.assert_frame_equal(da.VortexTraceAnalysisClass.synthesize_groups(df, "func", n_workers=2), expected)
+        # in a daemonic extraction worker the groups are fused serially instead of failing
+        with mp.get_context("fork").Pool(1) as pool:
+            ret = pool.apply(da.VortexTraceAnalysisClass.synthesize_groups, (df, "func"), {"n_workers" : 2})
+        pd.testing.assert_frame_equal(ret, expected)
+
+class TestClass_Roofline():
+    input_archive = './tests/inputs/vortex-trace-analysis-vecadd-test-input'
+    sections = './inputs/kernels_assembly/vecadd/sections.yml'
+    configs = { "synth_pivot"       : "code_section",
+                "overhead_key"      : "kernel",
+                "plot"              : "",
+                "zoomed_plot_keys"  : [],
+                "sections_to_drop"  : ["kernel_loops_bookkeeping", "kernel_memory_addressing"]}
+
+    @staticmethod
+    def reference_drop(df, over, sections_to_drop):
+        """Former row by row compaction of every (core, warp)."""
+        roofline_df = pd.DataFrame({})
+        for c in list(df["core"].unique()):
+            for w in list(df["warp"].unique()):
+                child_df = df.loc[(df["core"]==c) & (df["warp"]==w)].sort_values(by="eID").reset_index(drop=True)
+                saved_time = 0
+                iterations = len(child_df)
+                for i in range(iterations):
+                    if child_df.loc[i][over] in sections_to_drop:
+                        if i != iterations - 1: saved_time += child_df.loc[i+1]["schedule-stmp"] - child_df.loc[i]["schedule-stmp"]
+                        child_df = child_df.drop(i)
+                    else:
+                        child_df.loc[i, "schedule-stmp"] = child_df.loc[i]["schedule-stmp"] - saved_time
+                roofline_df = pd.concat([roofline_df, child_df], ignore_index=True)
+        return roofline_df
+
+    def test_matches_row_by_row_compaction(self):
+        rng = np.random.default_rng(0)
+        n = 400
+        df = pd.DataFrame({ "core"              : rng.integers(0, 2, n),
+                            "warp"              : rng.integers(0, 3, n),
+                            "eID"               : rng.permutation(n),
+                            "code_section"      : rng.choice(["a", "b", "c", None], n),
+                            "schedule-stmp"     : rng.integers(0, 5 * n, n).astype(float),
+                            "total-exec-time"   : rng.integers(1, 20, n).astype(float)})
+        pd.testing.assert_frame_equal(  da.VortexTraceAnalysisClass.drop_sections(df, "code_section", ["a", "c"]),
+                                        self.reference_drop(df, "code_section", ["a", "c"]), check_exact=True)
+
+    def test_golden_model(self, tmp_path):
+        osu.cmd('tar -xzf {} -C {}'.format(self.input_archive, tmp_path))
+        trace_path = str(tmp_path) + '/tests/inputs/vecadd_tan/'
+        code_map = da.VortexTraceAnalysisClass.gen_code_map(self.sections)
+        for fname in sorted(os.listdir(trace_path + 'raw')):
+            df = pd.read_feather(trace_path + 'raw/' + fname)
+            df["code_section"] = code_map.label(df["PC"].to_numpy())
+            df["e_count"] = utils.popcount(utils.tmask_to_bits(df["tmask"]))
+            da.VortexTraceAnalysisClass.make_roofline(df, df_ID=fname + '-ROOF', configs=self.configs, path=str(tmp_path) + '/')
+            gm_dict = yaml.safe_load(open(trace_path + 'golden_model/' + fname + '.roof.yml'))
+            test_dict = yaml.safe_load(open(str(tmp_path) + '/' + fname + '-ROOF.yml'))
+            assert gm_dict['last-commit'] == test_dict['last-commit']
+            assert gm_dict['section-exec-count'] == test_dict['section-exec-count']
+            assert gm_dict['total-exec-count'] == test_dict['total-exec-count']
@@ -0,0 +1,325 @@
+import toolkit.stream_parsing as sp
+import toolkit.experiments as exs
+
+import gzip
+import pytest
+import os
+import time
+import threading
+
+import pandas as pd
+import numpy as np
+
+def make_reference_df(n_instr=200, cores=2, warps=2):
+    rng = np.random.default_rng(0)
+    rows = []
+    for e in range(n_instr):
+        schedule = 10 * e + int(rng.integers(0, 5))
+        rows.append({   "core"              : e % cores,
+                        "warp"              : (e // cores) % warps,
+                        "tmask"             : int(rng.integers(0, 16)),
+                        "PC"                : 0x80000000 + 4 * (e % 16),
+                        "PC-id"             : hex(0x80000000 + 4 * (e % 16)),
+                        "eID"               : e,
+                        "instr"             : ["addi", "lw", "sw", "auipc"][e % 4],
+                        "schedule-stmp"     : float(schedule),
+                        "total-exec-time"   : float(int(rng.integers(1, 30)))})
+    return pd.DataFrame(rows)
+
+def make_trace_lines(df):
+    """Emits simx-like DEBUG/TRACE lines for the reference dataframe, commits are out of order."""
+    events = []
+    for r in df.itertuples(index=False):
+        PC = "0x{:x}".format(r.PC)
+        tmask = "{:04b}".format(r.tmask)
+        fetch = "DEBUG warp.cpp:62: Fetch: coreid={}, wid={}, tmask={}, PC={} (#{})\n".format(r.core, r.warp, tmask, PC, r.eID)
+        instr = "DEBUG warp.cpp:91: Instr {}: x1, x2\n".format(r.instr.upper())
+        tail = "coreid={}, wid={}, PC={}, ex=ALU, tmask={}, (#{})\n".format(r.core, r.warp, PC, tmask, r.eID)
+        schedule = int(r._7)
+        commit = schedule + int(r._8)
+        events.append((schedule - 1, 0, fetch))
+        events.append((schedule - 1, 1, instr))
+        events.append((schedule, 2, "TRACE {}: pipeline-schedule: {}".format(schedule, tail)))
+        events.append((commit, 3, "TRACE {}: pipeline-commit: {}".format(commit, tail)))
+    events.append((0, -1, "PERF: instrs={}, cycles=10\n".format(len(df))))
+    events.append((0, -1, "random simulator chatter\n"))
+    return [l for _, _, l in sorted(events, key=lambda x: (x[0], x[1]))]
+
+def make_parser(tmp_path, **kwargs):
+    return sp.VortexTraceAnalysisClass(output_file=str(tmp_path / "trace"), exp=exs.ExperimentClass({"app" : "vecadd"}), **kwargs)
+
+def make_replay_parser(tmp_path, lines, retcode=0, **kwargs):
+    """Parser whose command just prints the given lines (and exits with retcode) instead of running the simulator."""
+    log = tmp_path / "simx.txt"
+    log.write_text("".join(lines))
+    parser = make_parser(tmp_path, **kwargs)
+    parser.experiment.get_cmd_str = lambda: "sh -c 'cat {}; exit {}'".format(log, retcode)
+    return parser
+
+class TestClass_VortexTraceParsing():
+
+    def test_columnar_buffer_roundtrip(self):
+        schema = sp.VortexTraceAnalysisClass.TRACE_SCHEMA
+        buffer = sp.ColumnBufferClass(schema, chunk_size=7)
+        ref = make_reference_df(50)
+        for d in ref.to_dict("records"): buffer.append(d)
+        df = buffer.to_df()
+        assert list(df.columns) == list(schema.keys())
+        pd.testing.assert_frame_equal(df, ref, check_dtype=False)
+
+    def test_trace_reduction(self, tmp_path):
+        ref = make_reference_df()
+        parser = make_parser(tmp_path)
+        for l in make_trace_lines(ref): parser.parse_line(l)
+        df = parser.buffer.to_df().sort_values(by="eID").reset_index(drop=True)
+        pd.testing.assert_frame_equal(df, ref, check_dtype=False)
+
+    def test_out_of_order_and_unmatched_events(self, tmp_path):
+        ref = make_reference_df(20)
+        lines = make_trace_lines(ref)
+        # move every commit in front of its fetch and add a commit that never gets scheduled
+        commits = [l for l in lines if "pipeline-commit:" in l]
+        lines = commits + [l for l in lines if "pipeline-commit:" not in l]
+        lines.append("TRACE 9999: pipeline-commit: coreid=0, wid=0, PC=0x80000000, ex=ALU, tmask=0001, (#12345)\n")
+        parser = make_parser(tmp_path)
+        for l in lines: parser.parse_line(l)
+        parser.close_pending_events()
+        df = parser.buffer.to_df().sort_values(by="eID").reset_index(drop=True)
+        pd.testing.assert_frame_equal(df, ref, check_dtype=False)
+        assert parser.unmatched_commits == 1
+
+    def test_run_writes_feather(self, tmp_path):
+        ref = make_reference_df()
+        parser = make_replay_parser(tmp_path, make_trace_lines(ref))
+        assert parser.run() == 0
+        df = pd.read_feather(parser.output_file).sort_values(by="eID").reset_index(drop=True)
+        pd.testing.assert_frame_equal(df, ref, check_dtype=False)
+
+    def test_streaming_output_survives_crash(self, tmp_path):
+        ref = make_reference_df(300)
+        parser = make_replay_parser(tmp_path, make_trace_lines(ref), retcode=3, batch_size=16)
+        assert parser.run() == 3
+        assert parser.df.empty
+        assert len(parser.buffer) == 0
+        df = pd.read_feather(parser.output_file).sort_values(by="eID").reset_index(drop=True)
+        pd.testing.assert_frame_equal(df, ref, check_dtype=False)
+
+    def test_streaming_without_lz4(self, tmp_path, monkeypatch):
+        # pyarrow builds without lz4 fall back to zstd or to no compression
+        monkeypatch.setattr(sp, "VX_TRACE_COMPRESSION", None)
+        ref = make_reference_df(100)
+        parser = make_replay_parser(tmp_path, make_trace_lines(ref), batch_size=16)
+        assert parser.run() == 0
+        df = pd.read_feather(parser.output_file).sort_values(by="eID").reset_index(drop=True)
+        pd.testing.assert_frame_equal(df, ref, check_dtype=False)
+
+    def test_streaming_wide_in_flight_window(self, tmp_path):
+        ref = make_reference_df(1000, cores=8, warps=8)
+        ref["total-exec-time"] *= 50 # many more rows in flight than the batch size
+        lines = make_trace_lines(ref)
+        parser = make_replay_parser(tmp_path, lines, batch_size=16)
+        assert parser.run() == 0
+        assert parser.unmatched_commits == 0 and not parser.evicted
+        df = pd.read_feather(parser.output_file).sort_values(by="eID").reset_index(drop=True)
+        pd.testing.assert_frame_equal(df, ref, check_dtype=False)
+        # an explicit cap writes the oldest rows without their commit, the late events are counted apart
+        parser = make_replay_parser(tmp_path, lines, batch_size=16, max_pending_rows=64)
+        assert parser.run() == 0
+        df = pd.read_feather(parser.output_file)
+        assert len(df) == len(ref) and parser.unmatched_commits == 0
+        assert df["total-exec-time"].isna().sum() == len(parser.evicted) == parser.late_events > 0
+        assert not parser.pending_schedules and not parser.pending_commits
+
+    def test_line_decoders_match_tokenizer(self):
+        V = sp.VortexTraceAnalysisClass
+        fetch_lines = [ "DEBUG warp.cpp:62: Fetch: coreid=1, wid=3, tmask=0101, PC=0x8000001c (#42)\n",
+                        "DEBUG warp.cpp:62: Fetch: coreid=1, wid=3, tmask=0101, PC=0x8000001c, (#42)\n",
+                        "DEBUG warp.cpp:62: Fetch: wid=3, coreid=1, PC=0x8000001c, tmask=0101, (#42)\n"]
+        for l in fetch_lines:
+            assert V.decode_fetch_line(l) == V.get_instr_dict(l.split()[2:])
+            assert V.decode_fetch_line(l)["tmask"] == 0b0101
+        l = "TRACE 1061: pipeline-commit: coreid=0, wid=1, PC=0x80000004, ex=ALU, tmask=0011, (#5)\n"
+        event, d = V.decode_trace_line(l)
+        ref = V.get_trace_line_dict(l)
+        assert event == "commit"
+        assert d == {"time-stmp" : ref["time-stmp"], "eID" : ref["eID"]}
+        assert V.decode_trace_line("TRACE 1061: dcache-req: addr=0x100 (#5)\n") is None
+
+    def test_sharded_decoding(self, tmp_path):
+        ref = make_reference_df(500, cores=4, warps=4)
+        parser = make_replay_parser(tmp_path, make_trace_lines(ref), n_workers=3)
+        parser.shard_batch_size = 64
+        assert parser.run() == 0
+        pd.testing.assert_frame_equal(parser.df, ref, check_dtype=False)
+        df = pd.read_feather(parser.output_file)
+        pd.testing.assert_frame_equal(df, ref, check_dtype=False)
+
+    def test_sharded_decoding_keeps_serial_order(self, tmp_path):
+        ref = make_reference_df(500, cores=4, warps=4)
+        ref["eID"] = ref["core"] * 10000 + ref.index // 4 # monotonic per core only, as in simx traces
+        lines = make_trace_lines(ref)
+        serial = make_replay_parser(tmp_path, lines)
+        assert serial.run() == 0
+        assert not serial.df["eID"].is_monotonic_increasing
+        parser = make_replay_parser(tmp_path, lines, n_workers=3)
+        parser.shard_batch_size = 64
+        assert parser.run() == 0
+        pd.testing.assert_frame_equal(parser.df, serial.df)
+
+    def test_failing_shard_worker(self, tmp_path, monkeypatch):
+        ref = make_reference_df(500, cores=4, warps=4)
+        lines = make_trace_lines(ref)
+        def failing_reducer(cls): raise ValueError("broken reducer")
+        monkeypatch.setattr(sp.VortexTraceAnalysisClass, "make_shard_reducer", classmethod(failing_reducer))
+        parser = make_replay_parser(tmp_path, lines, n_workers=2)
+        parser.shard_batch_size = 1 # many more batches than the worker queue holds
+        with pytest.raises(RuntimeError, match="broken reducer"): parser.run()
+        assert not parser.workers
+
+    def test_killed_shard_worker(self, tmp_path, monkeypatch):
+        ref = make_reference_df(500, cores=4, warps=4)
+        def killed_reducer(cls): os._exit(9) # e.g. OOM-kill, no traceback
+        monkeypatch.setattr(sp.VortexTraceAnalysisClass, "make_shard_reducer", classmethod(killed_reducer))
+        parser = make_replay_parser(tmp_path, make_trace_lines(ref), n_workers=2)
+        parser.shard_batch_size = 1
+        with pytest.raises(RuntimeError, match="exit code 9"): parser.run()
+        assert not parser.workers
+
+    def test_filtered_compressed_capture(self, tmp_path):
+        ref = make_reference_df(100)
+        parser = make_replay_parser(tmp_path, make_trace_lines(ref), capture="filtered", compression="gzip")
+        assert parser.run() == 0
+        with gzip.open(parser.log_file + ".gz", "rt") as f:
+            log = f.readlines()
+        assert log == ["PERF: instrs=100, cycles=10\n", "random simulator chatter\n"]
+        parser = make_replay_parser(tmp_path, make_trace_lines(ref), capture="off")
+        os.remove(parser.log_file + ".gz")
+        assert parser.run() == 0
+        assert not os.path.exists(parser.log_file)
+
+    def test_failing_log_write_raises(self, tmp_path, monkeypatch):
+        class FullDiskClass(object):
+            def writelines(self, lines): raise OSError("No space left on device")
+            def close(self): pass
+        monkeypatch.setattr(sp.LogWriterClass, "open_file", staticmethod(lambda path, compression: FullDiskClass()))
+        writer = sp.LogWriterClass(str(tmp_path / "log"), block_size=1, max_blocks=1)
+        with pytest.raises(OSError):
+            for i in range(1000): writer.write("line {}\n".format(i))
+        with pytest.raises(OSError):
+            writer.close()
+        ref = make_reference_df(100)
+        parser = make_replay_parser(tmp_path, make_trace_lines(ref))
+        with pytest.raises(OSError):
+            parser.run()
+
+    def test_interrupt_kills_command(self, tmp_path):
+        parser = make_parser(tmp_path)
+        parser.experiment.get_cmd_str = lambda: "sh -c 'for i in $(seq 1000); do echo $i; done; exec sleep 60'"
+        def interrupt(line): raise KeyboardInterrupt
+        parser.parse_line = interrupt
+        start = time.monotonic()
+        with pytest.raises(KeyboardInterrupt):
+            parser.run()
+        assert time.monotonic() - start < 30
+        assert parser.process.returncode is not None
+        with pytest.raises(ProcessLookupError):
+            os.killpg(parser.process.pid, 0)
+
+    def test_abort_running_commands(self, tmp_path):
+        parser = make_parser(tmp_path)
+        parser.experiment.get_cmd_str = lambda: "sh -c 'exec sleep 60'"
+        thread = threading.Thread(target=parser.run)
+        thread.start()
+        while parser not in sp.RUNNING_COMMANDS: time.sleep(0.01)
+        sp.abort_running_commands()
+        thread.join(30)
+        assert not thread.is_alive()
+        assert parser.process.returncode is not None
+        assert parser not in sp.RUNNING_COMMANDS
+
+    def test_chatty_stderr_does_not_stall(self, tmp_path):
+        ref = make_reference_df(100)
+        parser = make_replay_parser(tmp_path, make_trace_lines(ref))
+        # far more stderr than a pipe buffer holds, written before any stdout
+        log = tmp_path / "simx.txt"
+        parser.experiment.get_cmd_str = lambda: "sh -c 'yes simx-warning | head -n 100000 1>&2; cat {}'".format(log)
+        parser.sterr_process_func = sp.LsStreamParsingClass.stderr_process_func
+        assert parser.run() == 0
+        with open(parser.stderr_log_file) as f:
+            assert sum(1 for _ in f) == 100000
+        pd.testing.assert_frame_equal(parser.df.sort_values(by="eID").reset_index(drop=True), ref, check_dtype=False)
+
+    def test_watchdog_keeps_partial_trace(self, tmp_path):
+        ref = make_reference_df(100)
+        parser = make_replay_parser(tmp_path, make_trace_lines(ref), idle_timeout=0.5)
+        # the simulator hangs after printing its trace
+        log = tmp_path / "simx.txt"
+        parser.experiment.get_cmd_str = lambda: "sh -c 'cat {}; sleep 60'".format(log)
+        start = time.monotonic()
+        assert parser.run() == parser.TIMEOUT_RETCODE
+        assert time.monotonic() - start < 30
+        assert parser.timeout_reason == "idle"
+        df = pd.read_feather(parser.output_file).sort_values(by="eID").reset_index(drop=True)
+        pd.testing.assert_frame_equal(df, ref, check_dtype=False)
+
+    def test_idle_limit_follows_the_pipe(self, tmp_path):
+        ref = make_reference_df(10)
+        parser = make_replay_parser(tmp_path, make_trace_lines(ref), idle_timeout=0.5)
+        # the simulator keeps printing while the parser is stuck on its first line
+        parser.experiment.get_cmd_str = lambda: "sh -c 'for i in $(seq 15); do echo chatter; sleep 0.1; done'"
+        parse_line = parser.parse_line
+        def slow_parse_line(line):
+            if parser.last_line_time == parser.start_time: time.sleep(1.2)
+            parse_line(line)
+        parser.parse_line = slow_parse_line
+        assert parser.run() == 0
+        assert parser.timeout_reason is None
+
+    def test_replay_saved_logs(self, tmp_path):
+        refs = [make_reference_df(50 * (i + 1)) for i in range(3)]
+        for i, ref in enumerate(refs):
+            d = tmp_path / "exp{}".format(i)
+            d.mkdir()
+            lines = "".join(make_trace_lines(ref))
+            if i == 0: (d / "process.log").write_text(lines)
+            elif i == 1:
+                with gzip.open(d / "process.log.gz", "wt") as f: f.write(lines)
+            else: (d / "run.log").write_text(lines)
+        (tmp_path / "exp0" / "process.stderr.log").write_text("not a trace\n")
+        results = sp.replay_trace_logs(str(tmp_path), n_workers=2)
+        assert [os.path.relpath(l, tmp_path) for l, _ in results] == ["exp0/process.log", "exp1/process.log.gz", "exp2/run.log"]
+        assert all(r == 0 for _, r in results)
+        for i, name in enumerate(["process", "process", "run"]):
+            df = pd.read_feather(tmp_path / "exp{}".format(i) / (name + ".feather")).sort_values(by="eID").reset_index(drop=True)
+            pd.testing.assert_frame_equal(df, refs[i], check_dtype=False)
+
+    def test_replay_per_experiment_logs(self, tmp_path):
+        refs = [make_reference_df(50 * (i + 1)) for i in range(2)]
+        names = ["0_vecadd_n64", "1_vecadd_n0.5"]
+        for ref, name in zip(refs, names):
+            log = tmp_path / (name + ".txt")
+            log.write_text("".join(make_trace_lines(ref)))
+            parser = sp.VortexTraceAnalysisClass(output_file=str(tmp_path / name), exp=exs.ExperimentClass({"app" : "vecadd"}),
+                                                 compression="gzip")
+            parser.experiment.get_cmd_str = lambda: "cat {}".format(log)
+            assert parser.run() == 0
+            assert parser.log_file == str(tmp_path / (name + ".log"))
+            os.remove(parser.output_file)
+        # the experiments share the output directory, each one has its own log rebuilt into its own trace
+        results = sp.replay_trace_logs(str(tmp_path))
+        assert [os.path.basename(l) for l, _ in results] == [n + ".log.gz" for n in names]
+        for ref, name in zip(refs, names):
+            df = pd.read_feather(tmp_path / (name + ".feather")).sort_values(by="eID").reset_index(drop=True)
+            pd.testing.assert_frame_equal(df, ref, check_dtype=False)
+
+    def test_line_rules_dispatch(self, tmp_path):
+        parser = sp.LsStreamParsingClass(str(tmp_path))
+        seen = []
+        parser.set_line_rules([ ("TRACE: skip",         None),
+                                ("TRACE",               lambda l: seen.append(("trace", l))),
+                                (sp.BLANK_LINE_RE,      None),
+                                (lambda l: "#" in l,    None),
+                                ("",                    lambda l: seen.append(("other", l)))])
+        for l in ["TRACE: skip me\n", "TRACE 1\n", "   \n", "a # comment\n", "PERF\n"]: parser.parse_line(l)
+        assert seen == [("trace", "TRACE 1\n"), ("other", "PERF\n")]
+        assert parser.capture_filter("TRACE: skip me\n") and not parser.capture_filter("PERF\n")
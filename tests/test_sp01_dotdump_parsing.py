@@ -0,0 +1,70 @@
+import toolkit.stream_parsing as sp
+
+import os
+
+import pandas as pd
+
+DUMP_FILE = "./tests/inputs/vortex-trace-analysis-class-test/test.dump"
+
+GNU_DUMP = """
+/tmp/kernel.elf:     file format elf32-littleriscv
+
+
+Disassembly of section .init:
+
+80000000 <_start>:
+80000000:\tfc102573          \tcsrr\ta0,mhartid
+80000004:\t00000597          \tauipc\ta1,0x0
+
+Disassembly of section .data:
+
+80001000 <buf>:
+80001000:\t00000000          \t.word\t0x00000000
+
+Disassembly of section .text:
+
+80000100 <main>:
+80000100:\t0005006b          \tvx_tmc\ta0
+"""
+
+class TestClass_DotDumpParsing():
+
+    def test_llvm_dump(self, tmp_path):
+        df = sp.DotDumpRISCVParsingClass(str(tmp_path), dump_file=DUMP_FILE, cache_dir="").get_df()
+        assert list(df.columns) == ["PC-id", "instr", "func"]
+        assert df.iloc[0].tolist() == ["0x80000000", "csrr", "_start"]
+        assert (df["instr"] == "wspawn").any() and not df["instr"].str.startswith("vx_").any()
+        assert os.path.isfile(tmp_path / "test.dump.feather")
+
+    def test_gnu_dump(self, tmp_path):
+        dump = tmp_path / "kernel.dump"
+        dump.write_text(GNU_DUMP)
+        df = sp.DotDumpRISCVParsingClass(str(tmp_path), dump_file=str(dump), cache_dir="").get_df()
+        assert df.values.tolist() == [  ["0x80000000", "csrr", "_start"],
+                                        ["0x80000004", "auipc", "_start"],
+                                        ["0x80000100", "tmc", "main"]]
+
+    def test_cache(self, tmp_path):
+        cache_dir = tmp_path / "cache"
+        ref = sp.DotDumpRISCVParsingClass(str(tmp_path), dump_file=DUMP_FILE, cache_dir=str(cache_dir)).get_df()
+        entries = os.listdir(cache_dir)
+        assert len(entries) == 1 and "-ELF32-riscv-" in entries[0]
+        parser = sp.DotDumpRISCVParsingClass(str(tmp_path), dump_file=DUMP_FILE, cache_dir=str(cache_dir))
+        parser.parse_line = None # a cache hit doesn't parse
+        pd.testing.assert_frame_equal(parser.get_df(), ref)
+        # a different content is a different entry
+        dump = tmp_path / "kernel.dump"
+        dump.write_text(GNU_DUMP)
+        sp.DotDumpRISCVParsingClass(str(tmp_path), dump_file=str(dump), cache_dir=str(cache_dir)).get_df()
+        assert len(os.listdir(cache_dir)) == 2
+
+    def test_parse_dump_files(self, tmp_path):
+        dump = tmp_path / "kernel.dump"
+        dump.write_text(GNU_DUMP)
+        dumps = {"k-llvm" : DUMP_FILE, "k-gnu" : str(dump), "k-llvm2" : DUMP_FILE}
+        df = sp.parse_dump_files(dumps, output_path=str(tmp_path), n_workers=2, cache_dir="")
+        assert df.index.name == "kernel"
+        assert list(df.index.unique()) == list(dumps.keys())
+        for k, f in dumps.items():
+            ref = sp.DotDumpRISCVParsingClass(str(tmp_path), dump_file=f, cache_dir="").get_df()
+            pd.testing.assert_frame_equal(df.loc[[k]].reset_index(drop=True), ref)
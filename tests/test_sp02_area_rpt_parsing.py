@@ -0,0 +1,54 @@
+import toolkit.stream_parsing as sp
+
+import os
+
+import pandas as pd
+
+AREA_RPT = """Report : area
+Design : top
+
+Instance      Module   Cells  Cell Area  Net Area  Total Area
+--------------------------------------------------------------
+top                    100   500.0   50.0   550.0
+  u0   modA     40   200.0   20.0   220.0
+    u00  modB   10   50.0   5.0   55.0
+    u01  modB   30   150.0   15.0   165.0
+  u1   modC     60   300.0   30.0   330.0
+    u10  modD   60   300.0   30.0   330.0
+      u100  modE   6   30.0   3.0   33.0
+
+1
+"""
+
+def run_parser(tmp_path, depth):
+    rpt = tmp_path / "top.area.rpt"
+    rpt.write_text(AREA_RPT)
+    parser = sp.AreaRptParsingClass(str(tmp_path), rpt_file=str(rpt), depth=depth)
+    assert parser.run() == 0
+    return parser
+
+class TestClass_AreaRptParsing():
+
+    def test_full_hierarchy(self, tmp_path):
+        parser = run_parser(tmp_path, -1)
+        df = parser.df
+        assert list(df.columns) == sp.AreaRptParsingClass.DF_COLUMNS
+        assert df["instance"].tolist() == ["top", "u0", "u00", "u01", "u1", "u10", "u100"]
+        assert df["parent"].tolist() == ["top", "top", "u0", "u0", "top", "u1", "u10"]
+        assert df["depth"].tolist() == [0, 1, 2, 2, 1, 2, 3]
+        assert df["total_area"].sum() == 550.0 + 220.0 + 55.0 + 165.0 + 330.0 + 330.0 + 33.0
+        assert parser.get_hierarchy()["parent_row"].tolist() == [-1, 0, 1, 1, 0, 4, 5]
+        leaf = parser.leaf_df
+        assert leaf["instance"].tolist() == ["u00", "u01", "u100"]
+        assert leaf[["depth_0", "depth_1", "depth_2", "depth_3"]].fillna("").values.tolist() == [
+                                                ["top", "u0", "u00", ""],
+                                                ["top", "u0", "u01", ""],
+                                                ["top", "u1", "u10", "u100"]]
+        pd.testing.assert_frame_equal(pd.read_feather(tmp_path / "top.area.rpt.feather"), df)
+        assert os.path.isfile(tmp_path / "top.area.rpt_leaf.csv")
+
+    def test_depth_cut(self, tmp_path):
+        parser = run_parser(tmp_path, 1)
+        assert parser.df["instance"].tolist() == ["top", "u0", "u1"]
+        assert parser.leaf_df["instance"].tolist() == ["u0", "u1"]
+        assert list(parser.leaf_df.columns[-2:]) == ["depth_0", "depth_1"]
@@ -2,4 +2,5 @@
 #
 from . import data_analysis
 from .. import plots
-from . import utils
\ No newline at end of file
+from . import utils
+from . import area_store
\ No newline at end of file
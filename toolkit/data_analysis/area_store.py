@@ -0,0 +1,176 @@
+import os
+import functools
+import multiprocessing as mp
+
+import numpy as np
+import pandas as pd
+
+from .. import stream_parsing as sp
+
+"""
+Columnar store of many hierarchical area reports (see stream_parsing.AreaRptParsingClass).
+Every instance of every report is one row, indexed by (report, path, module) where path is the "/" joined
+instance path from the top instance. Hardware configuration parameters of the reports (e.g. warps, threads)
+are kept in a separate table and joined to the query results, so a comparison over many configurations
+is a single vectorised query instead of one parse/filter per figure.
+"""
+
+AREA_COLUMNS = ["cell_count", "cell_area", "net_area", "total_area"]
+
+def parse_area_report(rpt_file : str, depth : int = -1) -> pd.DataFrame:
+    """Parses a report in-process (no output files) and returns its hierarchy table."""
+    parser = sp.AreaRptParsingClass(output_path=os.path.dirname(os.path.abspath(rpt_file)), rpt_file=rpt_file, depth=depth)
+    if parser.replay(rpt_file) != 0: raise ValueError("Error while parsing the area report {}.".format(rpt_file))
+    return parser.get_hierarchy()
+
+class AreaStoreClass():
+    """
+    Methods:
+        add_hierarchy(report, h, config)    - adds a parsed hierarchy (AreaRptParsingClass.get_hierarchy()) as report
+        add_report(report, rpt_file, config)- parses and adds an area report
+        add_reports(reports, n_workers)     - parses and adds {report : (rpt_file, config)} on a process pool
+        rollup(module, under)               - total area of the instances of module (below the instances/modules
+                                              named under), one row per report with its configuration
+        drilldown(under, levels)            - area of the modules levels below under, one row per report, one column per module
+        save / load                         - feather persistence of the store
+    Attributes:
+        df (pd.DataFrame)                   - one row per instance, index (report, path, module)
+        configs (pd.DataFrame)              - one row per report, configuration parameters as columns
+    """
+    def __init__(self):
+        self.parts = []
+        self.config_rows = {}
+        self.df_cache = None
+
+    # ------------------------ BUILDING ------------------------ #
+    @staticmethod
+    def make_paths(h : pd.DataFrame) -> np.ndarray:
+        instance = h["instance"].to_numpy(dtype=object)
+        parent = h["parent_row"].to_numpy()
+        depth = h["depth"].to_numpy()
+        path = instance.copy()
+        # parents come first in DFS order, so each depth level only needs the previous one
+        for d in range(1, int(depth.max()) + 1 if len(depth) else 0):
+            rows = np.flatnonzero(depth == d)
+            path[rows] = path[parent[rows]] + "/" + instance[rows]
+        return path
+
+    @staticmethod
+    def make_subtree_sizes(h : pd.DataFrame) -> np.ndarray:
+        """Number of rows in the subtree of each row (itself included): in DFS order the subtree of i is [i, i + size)."""
+        parent = h["parent_row"].to_numpy()
+        depth = h["depth"].to_numpy()
+        size = np.ones(len(h), dtype=np.int64)
+        for d in range(int(depth.max()) if len(depth) else 0, 0, -1):
+            rows = np.flatnonzero((depth == d) & (parent >= 0))
+            np.add.at(size, parent[rows], size[rows])
+        return size
+
+    def add_hierarchy(self, report : str, h : pd.DataFrame, config : dict = {}):
+        if report in self.config_rows: raise ValueError("Report {} already in the store.".format(report))
+        part = pd.DataFrame({   "report"        : report,
+                                "path"          : self.make_paths(h),
+                                "module"        : h["module"].to_numpy(dtype=object),
+                                "instance"      : h["instance"].to_numpy(dtype=object),
+                                "depth"         : h["depth"].to_numpy(),
+                                "subtree_size"  : self.make_subtree_sizes(h)})
+        for c in AREA_COLUMNS: part[c] = h[c].to_numpy()
+        self.parts.append(part)
+        self.config_rows[report] = dict(config)
+        self.df_cache = None
+
+    def add_report(self, report : str, rpt_file : str, config : dict = {}, depth : int = -1):
+        self.add_hierarchy(report, parse_area_report(rpt_file, depth), config)
+
+    def add_reports(self, reports : dict, n_workers : int = 0, depth : int = -1):
+        """reports: {report : (rpt_file, config)}, parsed on n_workers processes (0: one per CPU)."""
+        names = list(reports.keys())
+        files = [reports[r][0] for r in names]
+        n_workers = min(n_workers or os.cpu_count() or 1, len(names))
+        func = functools.partial(parse_area_report, depth=depth)
+        if n_workers <= 1:
+            hierarchies = [func(f) for f in files]
+        else:
+            with mp.get_context("fork").Pool(n_workers) as pool: # spawn would re-import the calling script
+                hierarchies = pool.map(func, files, chunksize=1)
+        for r, h in zip(names, hierarchies): self.add_hierarchy(r, h, reports[r][1])
+
+    @property
+    def df(self) -> pd.DataFrame:
+        if self.df_cache is None:
+            if not self.parts: raise ValueError("The area store is empty.")
+            df = pd.concat(self.parts, ignore_index=True)
+            df["report"] = df["report"].astype("category")
+            df["module"] = df["module"].astype("category")
+            self.parts = [df]
+            self.df_cache = df.set_index(["report", "path", "module"])
+        return self.df_cache
+
+    @property
+    def configs(self) -> pd.DataFrame:
+        return pd.DataFrame.from_dict(self.config_rows, orient="index").rename_axis("report")
+
+    # ------------------------ QUERIES ------------------------- #
+    def match(self, names) -> np.ndarray:
+        """Rows whose instance or module is one of names (str or list)."""
+        if isinstance(names, str): names = [names]
+        df = self.df
+        return df["instance"].isin(names).to_numpy() | df.index.get_level_values("module").isin(names)
+
+    def below(self, mask : np.ndarray) -> np.ndarray:
+        """Rows strictly inside the subtree of a row of mask."""
+        rows = np.flatnonzero(mask)
+        cover = np.zeros(len(mask) + 1, dtype=np.int64)
+        np.add.at(cover, rows + 1, 1)
+        np.add.at(cover, rows + self.df["subtree_size"].to_numpy()[rows], -1)
+        return np.cumsum(cover[:-1]) > 0
+
+    def join_configs(self, ret : pd.DataFrame) -> pd.DataFrame:
+        configs = self.configs
+        if configs.empty or len(configs.columns) == 0: return ret.reset_index()
+        return configs.join(ret, how="left").reset_index()
+
+    def rollup(self, module, under = None, column : str = "total_area") -> pd.DataFrame:
+        """
+        Area (column) of the instances of module (name or list), only below the instances/modules named under if given.
+        Nested instances of the same module are counted once (the outermost one). Returns one row per report.
+        """
+        mask = self.match(module)
+        if under is not None: mask &= self.below(self.match(under))
+        mask &= ~self.below(mask)
+        df = self.df
+        values = pd.Series(df[column].to_numpy()[mask], index=df.index.get_level_values("report")[mask])
+        ret = values.groupby(level=0, observed=False).sum().rename(column).to_frame()
+        return self.join_configs(ret)
+
+    def drilldown(self, under, levels : int = 1, column : str = "total_area") -> pd.DataFrame:
+        """Area (column) of the instances levels below the instances/modules named under, summed per module: one row per report, one column per module."""
+        df = self.df
+        top = self.match(under)
+        top &= ~self.below(top)
+        rows = np.flatnonzero(top)
+        # depth of the enclosing "under" instance for every row of its subtree
+        size = df["subtree_size"].to_numpy()[rows]
+        top_depth = np.zeros(len(df) + 1, dtype=np.int64)
+        np.add.at(top_depth, rows, df["depth"].to_numpy()[rows] + 1)
+        np.add.at(top_depth, rows + size, -(df["depth"].to_numpy()[rows] + 1))
+        top_depth = np.cumsum(top_depth[:-1]) - 1
+        mask = self.below(top) & (df["depth"].to_numpy() - top_depth == levels)
+        sub = df[mask]
+        ret = sub.pivot_table(index="report", columns="module", values=column, aggfunc="sum", observed=True, fill_value=0.0)
+        ret.columns.name = None
+        return self.join_configs(ret)
+
+    # ------------------------ PERSISTENCE --------------------- #
+    def save(self, path : str):
+        """Saves the store as <path>.feather (instances) and <path>.configs.feather (report configurations)."""
+        self.df.reset_index().to_feather(path + ".feather")
+        self.configs.reset_index().to_feather(path + ".configs.feather")
+
+    @classmethod
+    def load(cls, path : str):
+        store = cls()
+        df = pd.read_feather(path + ".feather")
+        store.parts = [df]
+        store.config_rows = pd.read_feather(path + ".configs.feather").set_index("report").to_dict(orient="index")
+        return store
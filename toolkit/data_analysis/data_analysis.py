@@ -1,6 +1,11 @@
 import os
 import yaml
+import shutil
+import multiprocessing as mp
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as pds
+import pyarrow.parquet as pq
 import seaborn as sns
 import matplotlib.pyplot as plt
 from typing import OrderedDict
@@ -55,26 +60,36 @@ class DataExtractionClass():
         raw_subdir (str): subdirectory where the experiment reports are stored. main directory is self.path. Default: "raw/".
         inplace_only (bool): if True, it only performs the inplace_process method. Default: False.
         yml_file (str): path to the yaml file containing the list of experiment reports to process. Default: "".
+        n_workers (int): number of processes running the per-file work (fault checkers, inplace_process, extracton_func). Default: 1.
+            Results are collected in file_list order and concatenated once; fault_handler runs in the main process.
+
+        partition_by (list): parameters partitioning the Parquet dataset written by extract(partition_by=...). Default: [] (no dataset).
+        batch_rows (int): rows buffered before being written to the dataset. Default: 100000.
 
         file_list (list): list of experiment reports to process. Can be obtained automatically from the raw_subdir or from the yml_file.
-        extracton_func (function): function to extract data from text experiment report.
+        extracton_func (function): function to extract data from text experiment report, returns its dataframe.
+            A subclass returning more (e.g. VortexPerfExtractionClass: (df, core_df)) unpacks it in its extract_files override.
         inplace_process (function): function to process the experiment report inplace.
         fault_checkers (list): list of functions to check if the experiment report is faulty.
         fault_handler (function): function to handle faulty experiment reports (what to do if a faulty experiment is detected).
         post_extraction_func (function): function to perform after the extraction process. (e.g. plotting or saving the extracted data)
         df (pandas.DataFrame): dataframe to store extracted data.
     """
-    def __init__(self, path, app, raw_subdir="raw/", inplace_only=False, yml_file=""):
+    def __init__(self, path, app, raw_subdir="raw/", inplace_only=False, yml_file="", n_workers=1):
         #paths
         self.path = path if path[-1]=="/" else path + "/"
         self.raw_subdir = self.path + raw_subdir
         self.checkpoint_path = self.path + "checkpoint.feather"
         self.output_dataframe_path = self.path + "dataframe.feather"
+        self.manifest_path = self.path + "dataframe.manifest.feather"
+        self.extracted_path = self.path + "dataframe.extracted.feather"
+        self.dataset_path = self.path + "dataset/"
 
         #base attributes
         self.app = app
         self.inplace_only = inplace_only
         self.yml_file = yml_file
+        self.n_workers = n_workers
 
         #reducing attributes
         self.file_list = []
@@ -97,6 +112,9 @@ class DataExtractionClass():
 
         #data structures
         self.df = pd.DataFrame({})
+        self.partition_by = []      # set by extract, see extract_partitioned
+        self.batch_rows = 100000    # rows kept in memory by extract_partitioned
+        self.dataset_schemas = []
 
     @staticmethod
     def dummy_fault_handler(fpath):
@@ -120,7 +138,7 @@ class DataExtractionClass():
             if ret: return ret
         return 0
 
-    def extract(self):
+    def extract(self, incremental=False, partition_by=None):
         """
         Extract data from text experiment report.
         Loops over all the files in the path, matching the fault_checker conditions, and:
@@ -129,50 +147,212 @@ class DataExtractionClass():
         If inplace_only is False, it concatenates the extracted dataframes.
         If a checkpoint file is present, it merges the extracted dataframe with the checkpoint dataframe.
             (the checkpoint dataframe is generated while executing the actual experiments)
+            Otherwise the experiment parameters are decoded from the file names (vda.gen_df_from_fnames, app templates).
         Finally can perform a post_extraction_func method.
         Notes:
+            With incremental=True, a manifest (dataframe.manifest.feather) records path, size, mtime, fault code and
+            row range of every file, the rows being kept before the checkpoint merge in dataframe.extracted.feather.
+            Files with the same size and mtime as in the manifest reuse their rows (faulty files are skipped, their
+            fault_handler already ran), only new or changed files are read. The manifest and the extracted rows are
+            rewritten only if some file changed, but dataframe.feather is always rewritten in full (checkpoint merge),
+            replacing the old one without backup.
+            With partition_by (e.g. ["app", "cores", "warps"]), rows are streamed to a Parquet dataset instead,
+            see extract_partitioned.
         """
+        self.partition_by = list(partition_by or [])
+        if self.partition_by:
+            if incremental or self.inplace_only: raise ValueError("A partitioned output needs a full extraction of the data.")
+            self.extract_partitioned()
+            self.post_extraction_func()
+            return
+
+        stats = {f : self.get_file_stat(f) for f in self.file_list} if incremental else {}
+        reused, faults, manifest_files = self.load_manifest(stats) if incremental else ({}, {}, set())
+
         #iterate over all files in the directory
-        for f in self.file_list:
-            r = self.is_exp_faulty(f)
+        dfs = {}
+        to_process = [f for f in self.file_list if f not in reused and f not in faults]
+        for f, r, df in self.extract_files(to_process):
             if r: 
                 self.fault_handler(f)
+                faults[f] = r
                 continue
-            self.inplace_process(f)
-            if not self.inplace_only: self.df = pd.concat([self.df,
-                                                           self.extracton_func(f)],
-                                                          ignore_index=True)
+            dfs[f] = df
+        dfs.update(reused)
+        files = [f for f in self.file_list if f in dfs] # file_list order
+        if incremental and (to_process or manifest_files != set(dfs) | set(faults)):
+            self.dump_manifest(files, dfs, stats, faults)
         if not self.inplace_only:
+            self.df = pd.concat([self.df] + [dfs[f] for f in files], ignore_index=True)
             try:
                 if os.path.isfile(self.checkpoint_path):
                     self.df = pd.merge(self.df, pd.read_feather(self.checkpoint_path), on="ID")
                     print("Added experiment metadata to dataframe.")
-                else: raise Exception("Checkpoint file not found.")
+                else:
+                    print("Checkpoint file not found, decoding the experiment parameters from the file names.")
+                    self.df = pd.merge(self.df, vda.gen_df_from_fnames(files, self.app), on="ID")
             except Exception as e: print("WARNING: {}".format(e))
-            self.dump_dataframe()
+            self.dump_dataframe(backup=not incremental)
         self.post_extraction_func()
 
-    def dump_dataframe(self):
-        if os.path.isfile(self.output_dataframe_path):
+    @staticmethod
+    def get_file_stat(fpath):
+        st = os.stat(fpath)
+        return st.st_size, st.st_mtime_ns
+
+    def load_manifest(self, stats):
+        """
+        Returns ({path : extracted rows}, {path : fault code}) of the files unchanged since the manifest was written,
+        and the set of paths in the manifest.
+        """
+        if not os.path.isfile(self.manifest_path): return {}, {}, set()
+        if not self.inplace_only and not os.path.isfile(self.extracted_path): return {}, {}, set()
+        manifest = pd.read_feather(self.manifest_path)
+        if "fault" not in manifest.columns: manifest["fault"] = 0 # manifests written before the faults were recorded
+        extracted = pd.read_feather(self.extracted_path) if not self.inplace_only else None
+        ret, faults = {}, {}
+        for f, size, mtime, fault, start, stop in manifest[["path", "size", "mtime", "fault", "row_start", "row_stop"]].itertuples(index=False):
+            if stats.get(f) != (size, mtime): continue
+            if fault: faults[f] = fault
+            else: ret[f] = None if self.inplace_only else extracted.iloc[start:stop]
+        print("Extraction manifest: {} unchanged files ({} faulty), {} to process.".format(
+                len(ret) + len(faults), len(faults), len(self.file_list) - len(ret) - len(faults)))
+        return ret, faults, set(manifest["path"])
+
+    def dump_manifest(self, files, dfs, stats, faults={}):
+        """Writes the manifest of the extracted files (rows in dfs) and of the faulty ones (no rows), in file_list order."""
+        entries = [f for f in self.file_list if f in dfs or f in faults]
+        lengths = [0 if f in faults or dfs[f] is None else len(dfs[f]) for f in entries]
+        stops = pd.Series(lengths, dtype="int64").cumsum()
+        manifest = pd.DataFrame({   "path"      : pd.Series(entries, dtype=object),
+                                    "size"      : pd.Series([stats[f][0] for f in entries], dtype="int64"),
+                                    "mtime"     : pd.Series([stats[f][1] for f in entries], dtype="int64"),
+                                    "fault"     : pd.Series([faults.get(f, 0) for f in entries], dtype="int64"),
+                                    "row_start" : stops - pd.Series(lengths, dtype="int64"),
+                                    "row_stop"  : stops})
+        if not self.inplace_only:
+            extracted = pd.concat([dfs[f] for f in files], ignore_index=True) if files else pd.DataFrame({})
+            extracted.to_feather(self.extracted_path)
+        manifest.to_feather(self.manifest_path)
+
+    def extract_file(self, fpath):
+        """Per-file work of extract: returns (fault code, extracted dataframe or None)."""
+        r = self.is_exp_faulty(fpath)
+        if r: return r, None
+        self.inplace_process(fpath)
+        return 0, None if self.inplace_only else self.extracton_func(fpath)
+
+    def extract_files(self, files=None):
+        """Yields (fpath, fault code, extracted dataframe) for files (default: file_list) in order, computed on n_workers processes."""
+        files = self.file_list if files is None else files
+        if self.n_workers <= 1 or len(files) <= 1:
+            for f in files: yield (f,) + self.extract_file(f)
+            return
+        global pool_extractor
+        pool_extractor = self # inherited by the forked workers, not pickled for every file
+        chunksize = max(1, len(files) // (8 * self.n_workers))
+        try:
+            with mp.get_context("fork").Pool(self.n_workers) as pool: # spawn would re-import the calling script
+                for f, ret in zip(files, pool.imap(pool_extract_file, files, chunksize=chunksize)):
+                    yield (f,) + ret
+        finally:
+            pool_extractor = None
+
+    def extract_partitioned(self):
+        """
+        Streams the extracted rows to a Parquet dataset (dataset/, hive partitioned by self.partition_by) with bounded memory:
+        the rows are merged with the checkpoint (or the parameters decoded from the file names) and written every
+        batch_rows rows, self.df stays empty. dataframe.feather is then written from the dataset, batch by batch,
+        as a consolidated view for the scripts reading the whole sweep. Rows are ordered by partition.
+        """
+        params = pd.read_feather(self.checkpoint_path) if os.path.isfile(self.checkpoint_path) else None
+        if os.path.isdir(self.dataset_path):
+            print("Replacing dataset {}".format(self.dataset_path))
+            shutil.rmtree(self.dataset_path)
+        self.dataset_schemas = []
+        batch, n_rows = [], 0
+        for f, r, df in self.extract_files():
+            if r:
+                self.fault_handler(f)
+                continue
+            batch.append((f, df))
+            n_rows += len(df)
+            if n_rows >= self.batch_rows:
+                self.write_dataset_batch(batch, params)
+                batch, n_rows = [], 0
+        if batch: self.write_dataset_batch(batch, params)
+        self.dump_dataframe()
+
+    def write_dataset_batch(self, batch, params=None):
+        """Writes [(fpath, extracted dataframe)] to the dataset, with the experiment parameters (params: checkpoint dataframe)."""
+        df = pd.concat([df for _, df in batch], ignore_index=True)
+        if params is None: params = vda.gen_df_from_fnames([f for f, _ in batch], self.app)
+        table = pa.Table.from_pandas(pd.merge(df, params, on="ID"), preserve_index=False)
+        pq.write_to_dataset(table, self.dataset_path, partition_cols=self.partition_by,
+                            basename_template="part-{}-{{i}}.parquet".format(len(self.dataset_schemas)))
+        self.dataset_schemas.append(table.schema)
+
+    def open_dataset(self):
+        """The dataset written by extract_partitioned, typed with the schemas of all the written batches."""
+        schema = pa.unify_schemas(self.dataset_schemas, promote_options="permissive")
+        partitioning = pds.partitioning(pa.schema([schema.field(c) for c in self.partition_by]), flavor="hive")
+        return pds.dataset(self.dataset_path, schema=schema, format="parquet", partitioning=partitioning)
+
+    def iter_output(self, columns=None):
+        """Yields the extracted rows: self.df, or the batches of dataframe.feather after a partitioned extraction."""
+        if not self.partition_by:
+            yield self.df if columns is None else self.df[columns]
+            return
+        with pa.memory_map(self.output_dataframe_path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                b = reader.get_batch(i)
+                yield (b if columns is None else b.select(columns)).to_pandas()
+
+    def dump_dataframe(self, backup=True):
+        if backup and os.path.isfile(self.output_dataframe_path):
             print("Dataframe already present...")
             osu.make_backup(self.output_dataframe_path)
-        self.df.to_feather(self.output_dataframe_path)
+        if not self.partition_by:
+            self.df.to_feather(self.output_dataframe_path)
+            return
+        if not self.dataset_schemas:
+            pd.DataFrame({}).to_feather(self.output_dataframe_path)
+            return
+        dataset = self.open_dataset()
+        options = pa.ipc.IpcWriteOptions(compression="lz4" if pa.Codec.is_available("lz4") else None)
+        with pa.OSFile(self.output_dataframe_path, "wb") as sink, pa.ipc.new_file(sink, dataset.schema, options=options) as writer:
+            for b in dataset.to_batches(batch_size=self.batch_rows): writer.write_batch(b)
+
+pool_extractor = None
+
+def pool_extract_file(fpath):
+    return pool_extractor.extract_file(fpath)
 
 class VortexPerfExtractionClass(DataExtractionClass):
     """
     Class to extract data from Vortex performance experiment report.
     Overrides the DataExtractionClass methods.
     List of methods overriden:
-        extracton_func -> vda.gen_df_from_log extracts the dataframe from the text experiment report.
-        fault_checkers -> [self.check_faults_by_string] checks if the experiment report is faulty by searching if a list of strings is present in the file.
+        extracton_func -> self.report_to_df extracts the dataframe from the text experiment report (vda.gen_df_from_log),
+            returned with the per-core PERF metrics of the report as (df, core_df).
+        fault_checkers -> [self.check_report_faults] checks if the experiment report is faulty by searching if a list of strings is present in the file.
+            The report is read once (vda.read_report) for both the fault check and the PERF metrics, which are kept until extraction.
+        dump_dataframe -> also saves the per-core PERF metrics in long format (ID, core, metric, value) to dataframe.cores.feather.
         fault_handlers -> vda.vortex_fault_handler handles faulty experiment reports.
         post_extraction_func -> self.add_extraction_feedback_to_checkpoint adds extraction metadata to the checkpoint file (e.g., info if some experiments need to be repeated).
     """
-    def __init__(self,path,app,yml_file=""):
+    def __init__(self,path,app,yml_file="",n_workers=1):
         super(VortexPerfExtractionClass, self).__init__(    path=path,
-                                                            app=app)
-        self.extracton_func = vda.gen_df_from_log
-        self.fault_checkers = [self.check_faults_by_string]
+                                                            app=app,
+                                                            n_workers=n_workers)
+        self.extracton_func = self.report_to_df
+        self.fault_checkers = [self.check_report_faults]
+        self.fault_str = ["INVALID EXPERIMENT"]
+        self.iter_report = (None, None, None) # (path, metrics, per-core rows) of the last report read
+        self.core_dataframe_path = self.path + "dataframe.cores.feather"
+        self.core_parts = []
+        self.core_df = pd.DataFrame({})
         self.fault_handlers = vda.vortex_fault_handler
         self.post_extraction_func = self.add_extraction_feedback_to_checkpoint
 
@@ -181,11 +361,13 @@ class VortexPerfExtractionClass(DataExtractionClass):
         Add extraction metadata to the checkpoint file.
         e.g., if one experiment had problems, marks it as faulty and needs to be repeated.
         """
+        if not os.path.isfile(self.checkpoint_path): return
         experiments_df = pd.read_feather(self.checkpoint_path)
-        #Make bad_df with null values
-        bad_df = self.df[self.df.isnull().any(axis=1)]
-        #Extend bad_df with cycles < 0
-        bad_df = pd.concat([bad_df, self.df[self.df["cycles"]<0]])
+        #Make bad_df with null values, extended with cycles < 0
+        bad_dfs = []
+        for df in self.iter_output():
+            bad_dfs += [df[df.isnull().any(axis=1)], df[df["cycles"]<0]]
+        bad_df = pd.concat(bad_dfs)
         if bad_df.empty:  print("No faulty experiments found!"); return
         
         #Handle faulty experiments
@@ -196,6 +378,55 @@ class VortexPerfExtractionClass(DataExtractionClass):
         osu.make_backup(self.checkpoint_path)
         experiments_df.to_feather(self.checkpoint_path)
 
+    def check_report_faults(self, fpath):
+        r, metrics, cores = vda.read_report(fpath, self.fault_str, cores=True)
+        self.iter_report = (fpath, metrics, cores)
+        return r
+
+    def report_to_df(self, fpath):
+        """
+        Returns (metrics row, per-core metrics in long format) of the report, not a single dataframe as the base extracton_func:
+        the per-core table comes back with the row from the extraction workers, extract_files splits the pair.
+        """
+        path, metrics, cores = self.iter_report
+        self.iter_report = (None, None, None)
+        if path != fpath: _, metrics, cores = vda.read_report(fpath, fault_str=[], cores=True)
+        df = vda.gen_df_from_log(fpath, metrics)
+        return df, vda.gen_core_df(cores, df["ID"].iloc[0])
+
+    def extract_files(self, files=None):
+        """Yields the metrics rows of report_to_df, its per-core tables are collected in self.core_parts."""
+        self.core_parts = []
+        for f, r, ret in super(VortexPerfExtractionClass, self).extract_files(files):
+            if ret is None:
+                yield f, r, None
+                continue
+            df, core_df = ret
+            self.core_parts.append(core_df)
+            yield f, r, df
+
+    def dump_dataframe(self, backup=True):
+        super(VortexPerfExtractionClass, self).dump_dataframe(backup)
+        self.dump_core_dataframe()
+
+    def dump_core_dataframe(self):
+        """
+        Saves the per-core metrics in long format (ID, core, metric, value) to dataframe.cores.feather.
+        Rows of the experiments not extracted in this run (unchanged files of an incremental extraction) are kept
+        from the previous file, as long as the experiment is still in the dataframe.
+        """
+        parts = self.core_parts
+        if os.path.isfile(self.core_dataframe_path):
+            old = pd.read_feather(self.core_dataframe_path)
+            new_IDs = [p["ID"].iloc[0] for p in parts if not p.empty]
+            IDs = pd.concat([df["ID"] for df in self.iter_output(["ID"])])
+            keep = old["ID"].isin(IDs) & ~old["ID"].isin(new_IDs)
+            parts = [old[keep]] + parts
+        if not parts: return
+        self.core_df = pd.concat(parts, ignore_index=True)
+        self.core_df["metric"] = self.core_df["metric"].astype("category")
+        self.core_df.to_feather(self.core_dataframe_path)
+
     @staticmethod
     def check_faults_by_string(fpath, fault_str=["INVALID EXPERIMENT"]):
         """
@@ -219,7 +450,7 @@ class VortexTraceAnalysisClass(DataExtractionClass):
         inplace_process -> self.trace_analysis performs the actual analysis.
 
     """
-    def __init__(self,path,app,yml_file=""):
+    def __init__(self,path,app,yml_file="",n_workers=1):
         """
         Class to extract data from Vortex trace.
         Args:
@@ -228,7 +459,8 @@ class VortexTraceAnalysisClass(DataExtractionClass):
         """
         super(VortexTraceAnalysisClass, self).__init__( path=path,
                                                         app=app,
-                                                        inplace_only=True)
+                                                        inplace_only=True,
+                                                        n_workers=n_workers)
         
         self.yml_file = yml_file
 
@@ -242,7 +474,9 @@ class VortexTraceAnalysisClass(DataExtractionClass):
                         "overhead_key": "",
                         "zoomed_plot_keys": [],
                         "sections_to_drop": [],
-                        "roofline_tag": ""}
+                        "roofline_tag": "",
+                        "dump_workers": 0,      # processes parsing the kernel dumps of kernel_key (0: one per CPU)
+                        "synth_workers": 1}     # processes fusing the (core, section) groups of a trace, see synthesize_groups
 
         if self.yml_file:
             if os.path.isfile(self.yml_file): 
@@ -264,15 +498,18 @@ class VortexTraceAnalysisClass(DataExtractionClass):
         self.iter_fname = "" 
 
     def gen_ref_code_df(self):
+        """
+        Returns the reference code table (PC-id, instr, func) of the dotdump file.
+        With kernel_key, dotdump_path maps kernel names to dump files: the dumps are parsed concurrently
+        (configs["dump_workers"] processes, default one per CPU) into a single table indexed by kernel.
+        """
         print("Generating reference code dataframe...")
         if self.configs["kernel_key"]:
             print("Found multiple dotdump files...")
-            ret = {}
-            for k in self.configs["dotdump_path"].keys():
-                print("--->Generating reference code dataframe for {}...".format(k))
-                if not os.path.isfile(self.configs["dotdump_path"][k]): raise Exception("Dotdump file {} not found!".format(self.configs["dotdump_path"][k]))
-                ret[k] = sp.DotDumpRISCVParsingClass(  output_path=self.path,
-                                                        dump_file=self.configs["dotdump_path"][k]).get_df()
+            for k, f in self.configs["dotdump_path"].items():
+                if not os.path.isfile(f): raise Exception("Dotdump file {} not found!".format(f))
+            ret = sp.parse_dump_files(  self.configs["dotdump_path"], output_path=self.path,
+                                        n_workers=self.configs.get("dump_workers", 0))
         else:
             if not os.path.isfile(self.configs["dotdump_path"]): raise Exception("Dotdump file not found!")
             ret = sp.DotDumpRISCVParsingClass(  output_path=self.path,
@@ -306,10 +543,10 @@ class VortexTraceAnalysisClass(DataExtractionClass):
         This needs to be written by hand to tag PCs with the corresponding code section.
         """
         def get_ref_code_df(ref_code_df, fpath):
-            if type(ref_code_df) == dict:
-                for k in ref_code_df.keys():
+            if ref_code_df.index.name == "kernel":
+                for k in ref_code_df.index.unique():
                     if "_"+k+"_" in fpath or "_"+k+"." in fpath:
-                        return ref_code_df[k]
+                        return ref_code_df.loc[[k]].reset_index(drop=True)
             else: return ref_code_df
 
         r = False
@@ -352,8 +589,13 @@ class VortexTraceAnalysisClass(DataExtractionClass):
     # ---------------------------- UTILS ----------------------- #
 
     @staticmethod
-    def get_exec_count(x):
-        return x["tmask"].count("1")        
+    def is_legacy_trace(df):
+        """Traces written before the uint64 tmask of stream_parsing keep the printed mask read back as a decimal int64."""
+        return df["tmask"].dtype.kind == "i"
+
+    @staticmethod
+    def get_exec_count(x, legacy=False):
+        return utils.popcount(utils.tmask_to_bits([x["tmask"]], legacy))[0]
 
     @staticmethod
     def extract_last_cycle(df):
@@ -399,44 +641,21 @@ class VortexTraceAnalysisClass(DataExtractionClass):
         return info
     
     @staticmethod
-    def gen_code_map(code_sections_fname: str) -> dict:
+    def gen_code_map(code_sections_fname: str):
         """
-        Generate a code map (lookup table) from a yaml file.
+        Generate a code map from a yaml file.
         Args:
             code_sections_fname (str): path to the yaml file containing the code sections.
         Returns:
-            dict: code map. Dictionary with keys = code instruction PC names and values = list of code section addresses.
+            utils.CodeMapClass: sorted interval tables of the code sections, labelling PC columns (label) with "fini"
+            for the PCs outside the sections. Empty dict if the file is not found.
         """
         if not os.path.isfile(code_sections_fname):
             print("Code sections file not found!")
             return {}
         
         code_sections = yaml.load(open(code_sections_fname, "r"), Loader=yaml.FullLoader)
-        code_map = {}
-        #Generating a list of PC addresses for each code section
-        for s in code_sections.keys():
-            code_map[s] = []
-            for e in code_sections[s]:
-                if type(e) == int: code_map[s].append(e)
-                elif type(e) == list: code_map[s].extend(e)
-                elif type(e) == str: 
-                    ee = e.split(":")
-                    code_map[s].extend(range(int(ee[0],base=16),int(ee[1],base=16)+1,4))
-        
-        #Generating program boundaries
-        vmin = 0x80000000
-        vmax = vmin
-        for s in code_map.keys():
-            vmax = max(vmax, max(code_map[s])) #getting the max value of the code map
-
-        #Generating the reverse code map -> key = PC address, value = code section name
-        ret_code_map = {}
-        for i in range(vmin,vmax+1):
-            for s in code_map.keys():
-                if i in code_map[s]:
-                    ret_code_map[i] = s
-                    break
-        return ret_code_map
+        return utils.CodeMapClass(code_sections)
     
     @staticmethod
     def gen_func_code_map(dot_dump_fname: str) -> pd.DataFrame:
@@ -447,6 +666,44 @@ class VortexTraceAnalysisClass(DataExtractionClass):
 # ----------------------------------------------------------- #
 # ------------------------ MAIN FUNCTIONS ------------------- #
 
+    @staticmethod
+    def synthesize_group(key, child_df: pd.DataFrame, over: str) -> pd.DataFrame:
+        """Fused events of the (core, section) key, with the core and section columns."""
+        c, s = key
+        events = utils.TimeSeriesClass( ID="{}_{}".format(c,s),
+                                        events=child_df,
+                                        period_col_name="total-exec-time",
+                                        start_col_name="schedule-stmp").make_synthesis()
+        events_len = len(events)
+        events["core"] = [c]*events_len
+        events[over] = [s]*events_len
+        return events
+
+    @staticmethod
+    def synthesize_groups(df: pd.DataFrame, over: str, n_workers: int = 1) -> pd.DataFrame:
+        """
+        Fused events of every (core, over) group of df, from a single groupby pass.
+        Groups are ordered core by core then section by section, in order of first appearance in df,
+        and are fused on n_workers processes (0: one per CPU) if more than one.
+        Inside a worker of the extraction pool (n_workers of the class), which can't have children, groups are fused serially.
+        """
+        if df.empty: return pd.DataFrame({})
+        core_rank = {c : i for i, c in enumerate(df["core"].unique())}
+        over_rank = {s : i for i, s in enumerate(df[over].unique())}
+        # rows with a missing section belong to no group, as with the former per section filtering
+        groups = sorted(df.groupby(["core", over], sort=False), key=lambda g: (core_rank[g[0][0]], over_rank[g[0][1]]))
+        if not groups: return pd.DataFrame({})
+        n_workers = min(n_workers or os.cpu_count() or 1, len(groups))
+        if n_workers > 1 and mp.current_process().daemon:
+            print("WARNING: synth_workers ignored inside an extraction worker process, fusing the groups serially.")
+            n_workers = 1
+        if n_workers <= 1:
+            parts = [VortexTraceAnalysisClass.synthesize_group(k, child_df, over) for k, child_df in groups]
+        else:
+            with mp.get_context("fork").Pool(n_workers) as pool: # spawn would re-import the calling script
+                parts = pool.starmap(VortexTraceAnalysisClass.synthesize_group, [(k, child_df, over) for k, child_df in groups])
+        return pd.concat(parts, ignore_index=True)
+
     @staticmethod
     def make_synthesis(df: pd.DataFrame, df_ID: str, configs: dict, path: str ="") -> pd.DataFrame:
         print("Total number of events {}: {}".format(df_ID,len(df)))
@@ -457,20 +714,7 @@ class VortexTraceAnalysisClass(DataExtractionClass):
         plot = configs["plot"]
         zoomed_plot_keys = configs["zoomed_plot_keys"]
 
-        synthesis_df = pd.DataFrame({})
-        for c in list(df["core"].unique()):
-            for s in list(df[over].unique()):
-                child_df = df.loc[(df["core"]==c) & (df[over]==s)]
-                if child_df.empty: continue
-                #extracting the fused events
-                events = utils.TimeSeriesClass( ID="{}_{}".format(c,s),
-                                                events=child_df,
-                                                period_col_name="total-exec-time",
-                                                start_col_name="schedule-stmp").make_synthesis()
-                events_len = len(events)
-                events["core"] = [c]*events_len
-                events[over] = [s]*events_len
-                synthesis_df = pd.concat([synthesis_df, events], ignore_index=True)
+        synthesis_df = VortexTraceAnalysisClass.synthesize_groups(df, over, n_workers=configs.get("synth_workers", 1))
 
         if path:
             print("Saving synthesis dataframe:{}".format(path))
@@ -494,50 +738,47 @@ class VortexTraceAnalysisClass(DataExtractionClass):
                                                                         sections=["workload_distr","kernel_call_init","kernel_call_init_inner","kernel","kernel_loops_bookkeeping","kernel_memory_addressing"])
         return synthesis_df
 
+    @staticmethod
+    def drop_sections(df: pd.DataFrame, over: str, sections_to_drop: list) -> pd.DataFrame:
+        """
+        Removes the events of sections_to_drop and compacts the schedule of every (core, warp) in eID order:
+        each dropped event saves the time up to the next event of its warp, which is subtracted from the later ones.
+        Groups are ordered core by core then warp by warp, in order of first appearance in df.
+        """
+        df = df.assign(core_rank=pd.factorize(df["core"])[0], warp_rank=pd.factorize(df["warp"])[0])
+        df = df.sort_values(by=["core_rank", "warp_rank", "eID"], kind="stable", ignore_index=True)
+        keys = ["core_rank", "warp_rank"]
+
+        drop = df[over].isin(sections_to_drop).to_numpy()
+        is_last = ~df.duplicated(keys, keep="last").to_numpy()
+        next_stmp = df.groupby(keys, sort=False)["schedule-stmp"].shift(-1)
+        # the last event of a warp has no next event, it saves nothing
+        df["saved_time"] = (next_stmp - df["schedule-stmp"]).where(drop & ~is_last, 0).astype(df["schedule-stmp"].dtype)
+        df["schedule-stmp"] = df["schedule-stmp"] - df.groupby(keys, sort=False)["saved_time"].cumsum()
+        return df.loc[~drop].drop(columns=keys + ["saved_time"]).reset_index(drop=True)
+
     @staticmethod
     def make_roofline(df, df_ID, configs, path="", plot=False):
         sections_to_drop = configs["sections_to_drop"]
         over = configs["synth_pivot"]
 
-        roofline_df = pd.DataFrame({})
-        for c in list(df["core"].unique()):
-            for w in list(df["warp"].unique()):
-                child_df = df.loc[(df["core"]==c) & (df["warp"]==w)]
-                saved_time = 0
-                child_df = child_df.sort_values(by="eID")
-                child_df.reset_index(drop=True, inplace=True)
-                iterations = len(child_df)
-                for i in range(iterations):
-                    if child_df.loc[i][over] in sections_to_drop:
-                        # need to avoid the last iteration
-                        if i!=iterations-1: saved_time += child_df.loc[i+1]["schedule-stmp"] - child_df.loc[i]["schedule-stmp"]
-                        child_df = child_df.drop(i)
-                    else:
-                        child_df.loc[i, "schedule-stmp"] = child_df.loc[i]["schedule-stmp"] - saved_time
-                        #time = child_df.loc[i]["schedule-stmp"]
-                elen = len(child_df)
-                child_df["core"] = [c]*elen
-                child_df["warp"] = [w]*elen
-                roofline_df = pd.concat([roofline_df, child_df], ignore_index=True)
+        roofline_df = VortexTraceAnalysisClass.drop_sections(df, over, sections_to_drop)
         if path:
             roofline_df.to_feather(path+df_ID+".feather")
             VortexTraceAnalysisClass.make_synthesis(roofline_df, df_ID, configs, path)
+        return roofline_df
 
     def trace_analysis(self, fpath):
         del fpath #not used
 
         #Preprocessing the dataframe self.iter_df
         #----------Add code sections
-        def get_code_section(x):
-            try:
-                return self.code_sections[x["PC"]]
-            except:
-                return "fini"
-        if self.code_sections: self.iter_df["code_section"]    = self.iter_df.apply(get_code_section, axis=1)
+        if self.code_sections: self.iter_df["code_section"]    = self.code_sections.label(self.iter_df["PC"].to_numpy())
         #----------Add function names
         self.iter_df = pd.merge(self.iter_df, self.iter_ref_code_df.drop("instr",axis=1), on="PC-id", how="left")
         #----------Add active threads
-        self.iter_df["e_count"]         = self.iter_df.apply(self.get_exec_count, axis=1)
+        legacy = self.is_legacy_trace(self.iter_df)
+        self.iter_df["e_count"]         = utils.popcount(utils.tmask_to_bits(self.iter_df["tmask"], legacy))
 
         #Making the analysis result path
         stripped_df_name = self.iter_fname.split("/")[-1].split(".")[0]
@@ -552,7 +793,7 @@ class VortexTraceAnalysisClass(DataExtractionClass):
         if self.configs["sections_to_drop"]: self.make_roofline(self.iter_df,
                                                                 df_ID=stripped_df_name+self.configs["roofline_tag"],
                                                                 path=output_path,
-                                                                configs=self.configs["sections_to_drop"])
+                                                                configs=self.configs)
         
 
 class VortexTracePostProcessingClass(DataExtractionClass):
@@ -564,10 +805,11 @@ class VortexTracePostProcessingClass(DataExtractionClass):
         fault_checkers -> [self.is_not_exp_dir] checks if the directory is an experiment directory.
         post_extraction_func -> self.post_extraction plots the extracted data.
     """
-    def __init__(self,path,app):
+    def __init__(self,path,app,n_workers=1):
         super(VortexTracePostProcessingClass, self).__init__(   path=path,
                                                                 app=app,
-                                                                raw_subdir="")
+                                                                raw_subdir="",
+                                                                n_workers=n_workers)
         self.extracton_func = self.trace_postprocessing
         self.post_extraction_func = self.post_extraction
         self.fault_checkers = [self.is_not_exp_dir]
@@ -635,11 +877,12 @@ class VortexExperimentReductionClass(DataExtractionClass):
         derived_cols (dict, can be overridden in child class):
             dictionary with keys = column names and values = functions to derive the column from aggregated ones.
     """
-    def __init__(self, path, app, yml_file):
+    def __init__(self, path, app, yml_file, n_workers=1):
         super(VortexExperimentReductionClass, self).__init__(   path=path,
                                                                 app=app,
                                                                 raw_subdir="",
-                                                                yml_file=yml_file)
+                                                                yml_file=yml_file,
+                                                                n_workers=n_workers)
         assert os.path.isfile(self.yml_file), "YAML file not found!"
         yml = yaml.load(open(self.yml_file, "r"), Loader=yaml.FullLoader)
         # setting up the attributes from the yaml file
@@ -680,11 +923,12 @@ class VortexComparativeAnalysisClass(DataExtractionClass):
         - str: lambda function to apply to the dataframe.
         - dict: {"name": name of the function to apply to the dataframe, "args": dictionary of arguments to pass to the function}
     """
-    def __init__(self, path, app, yml_file):
+    def __init__(self, path, app, yml_file, n_workers=1):
         super(VortexComparativeAnalysisClass, self).__init__(   path=path,
                                                                 app=app,
                                                                 raw_subdir="",
-                                                                yml_file=yml_file)
+                                                                yml_file=yml_file,
+                                                                n_workers=n_workers)
         assert os.path.isfile(self.yml_file), "YAML file not found!"
         yml = yaml.load(open(self.yml_file, "r"), Loader=yaml.FullLoader)
 
@@ -1,5 +1,6 @@
 from typing import Union
 from dataclasses import dataclass
+import numpy as np
 import pandas as pd
 
 @dataclass
@@ -58,8 +59,51 @@ class TimeSeriesClass():
                                         ecount=self.events.iloc[0]["e_count"])]
     
     def make_synthesis(self) -> pd.DataFrame:
+        """
+        Fuses the overlapping events: sorted by start, an event opens a new fused event if it starts after the end
+        of the current one (the running maximum of the end times).
+        As in the event by event fold (fold_events), the first fused event is seeded with the first event of the
+        unsorted frame, followed by the sorted events except the first one.
+        """
         self.events = self.events.sort_values(by=self.start_col_name)
         self.events.reset_index(drop=True, inplace=True)
+        row_dtype = self.events.iloc[0].dtype # rows were read one by one, i.e. upcast to a common type if all numeric
+        if row_dtype == object: row_dtype = None
+        first = self.trace[0]
+        start = np.concatenate(([first.start], self.events[self.start_col_name].to_numpy(dtype=row_dtype)[1:]))
+        period = np.concatenate(([first.period], self.events[self.period_col_name].to_numpy(dtype=row_dtype)[1:]))
+        ecount = np.concatenate(([first.thread_sub_events], self.events["e_count"].to_numpy(dtype=row_dtype)[1:]))
+        if not (np.asarray(period, dtype=np.float64) > 0).all() or np.isnan(np.asarray(start, dtype=np.float64)).any():
+            return self.fold_events() # NaN and empty events (period <= 0) are special cases of TimeEventClass.register
+        end = start + period
+
+        new = np.zeros(len(start), dtype=bool)
+        new[0] = True
+        skip = 1
+        if len(start) > 1 and start[1] < start[0]:
+            new[1] = True # the unsorted seed event is alone, the sorted sequence starts at 1
+            skip = 2
+        # in a sorted sequence the running max of the ends is the end of the current fused event
+        running_end = np.maximum.accumulate(end[skip - 1:-1])
+        new[skip:] |= start[skip:] > running_end
+        # fused events whose period is recomputed from an event ending at or after the current end
+        extends = np.zeros(len(start), dtype=bool)
+        extends[skip:] = ~new[skip:] & (end[skip:] >= running_end)
+
+        heads = np.flatnonzero(new)
+        group_start, group_period = start[heads], period[heads]
+        max_end = np.maximum.reduceat(end, heads)
+        extended = np.logical_or.reduceat(extends, heads)
+        df = pd.DataFrame({ "ID"                : np.arange(len(heads)),
+                            "period"            : np.where(extended, max_end - group_start, group_period) if extended.any() else group_period,
+                            "start"             : group_start,
+                            "event_count"       : np.diff(np.append(heads, len(start))),
+                            "thread_event_count": np.add.reduceat(ecount, heads)})
+        df.rename(columns={"period":self.period_col_name, "start":self.start_col_name}, inplace=True)
+        return df
+
+    def fold_events(self) -> pd.DataFrame:
+        """Event by event fusion with TimeEventClass.register, on the sorted events (see make_synthesis)."""
         for i in range(1,len(self.events)):
             is_not_new = self.trace[self.iter].register(    period=self.events.iloc[i][self.period_col_name], 
                                                             start=self.events.iloc[i][self.start_col_name],
@@ -78,4 +122,105 @@ class TimeSeriesClass():
             l.append(t.to_dict())
         df = pd.DataFrame(l)
         df.rename(columns={"period":self.period_col_name, "start":self.start_col_name}, inplace=True)
-        return df
\ No newline at end of file
+        return df
+
+
+# Thread masks (tmask) are kept as unsigned bitmasks (uint64), bit i set if thread i is active.
+# Traces written before were storing the printed mask ("0011", thread 0 rightmost) as a string,
+# or read back as the decimal integer of its digits (int64, e.g. 11 for "0011").
+def tmask_to_bits(tmask, legacy : bool = False) -> np.ndarray:
+    """
+    uint64 bitmask array from a tmask column: numeric bitmasks (NaN, e.g. from an outer merge, as no active thread)
+    or printed binary strings. With legacy, numbers are the decimal reading of printed masks (11 for "0011"),
+    a ValueError is raised for digits other than 0/1.
+    """
+    tmask = pd.Series(tmask)
+    if not legacy and tmask.dtype.kind in "uib": return tmask.to_numpy(dtype=np.uint64)
+    if not legacy and tmask.dtype.kind == "f": return tmask.fillna(0).to_numpy(dtype=np.uint64)
+    codes, masks = pd.factorize(tmask) # few distinct masks
+    if legacy:
+        masks = [str(m) for m in masks]
+        if any(set(m) - set("01") for m in masks):
+            raise ValueError("Legacy tmask column with non binary digits.")
+    bits = np.array([int(m, base=2) if isinstance(m, str) else int(m) for m in masks] + [0], dtype=np.uint64)
+    return bits[codes]
+
+def popcount(bits) -> np.ndarray:
+    """Number of set bits (active threads) of every mask."""
+    bits = np.asarray(bits, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"): return np.bitwise_count(bits).astype(np.int64) # numpy >= 2.0
+    return np.unpackbits(bits.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1, dtype=np.int64)
+
+def lane_utilization(tmask, n_lanes : int = 0, legacy : bool = False) -> pd.Series:
+    """
+    Fraction of the masks with each lane (thread) active, indexed by lane (legacy: see tmask_to_bits).
+    n_lanes defaults to the highest active lane + 1. Usable per group, e.g. df.groupby("code_section")["tmask"].apply(lane_utilization).
+    """
+    bits = tmask_to_bits(tmask, legacy)
+    if not n_lanes: n_lanes = int(bits.max()).bit_length() if len(bits) else 0
+    ret = [((bits >> np.uint64(i)) & np.uint64(1)).mean() if len(bits) else np.nan for i in range(n_lanes)]
+    return pd.Series(ret, index=pd.RangeIndex(n_lanes, name="lane"), dtype=np.float64)
+
+class CodeMapClass():
+    """
+    Map from PC addresses to code sections, compiled from a sections yml file:
+        {section : [PC, [PC, ...], "start:end" (hex, stepped by 4)]}
+    Sections are matched in file order (the first one containing the PC wins). PCs below base or in no section map to default.
+    The entries are kept as disjoint sorted intervals of PC // STEP, one set for each PC % STEP, so a whole PC column
+    is labelled with one searchsorted per residue instead of a lookup per row.
+    """
+    STEP = 4
+
+    def __init__(self, code_sections : dict, base : int = 0x80000000, default : str = "fini"):
+        self.sections = list(code_sections.keys())
+        self.names = np.array(self.sections + [default], dtype=object) # code -1 -> default
+        intervals = [[] for _ in range(self.STEP)] # (first, last, section) in PC // STEP
+        for i, s in enumerate(self.sections):
+            for e in code_sections[s]:
+                if type(e) == int: pcs = [(e, e)]
+                elif type(e) == list: pcs = [(x, x) for x in e]
+                elif type(e) == str:
+                    start, end = (int(x, base=16) for x in e.split(":"))
+                    pcs = [(start, start + (end - start) // self.STEP * self.STEP)] if end >= start else []
+                else: pcs = []
+                for first, last in pcs:
+                    r = first % self.STEP
+                    first = max(first, base + (r - base) % self.STEP) # first PC >= base with the same residue
+                    if first <= last: intervals[r].append((first // self.STEP, last // self.STEP, i))
+        self.tables = [self.make_table(x) for x in intervals]
+
+    @staticmethod
+    def make_table(intervals : list) -> tuple:
+        """Splits possibly overlapping (first, last, section) intervals into sorted disjoint (starts, stops, sections) arrays."""
+        bounds = sorted(set([x[0] for x in intervals] + [x[1] + 1 for x in intervals]))
+        starts, stops, codes = [], [], []
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            covering = [x[2] for x in intervals if x[0] <= lo and hi - 1 <= x[1]]
+            if not covering: continue
+            code = min(covering)
+            if codes and codes[-1] == code and stops[-1] == lo: stops[-1] = hi
+            else:
+                starts.append(lo)
+                stops.append(hi)
+                codes.append(code)
+        return np.array(starts, dtype=np.int64), np.array(stops, dtype=np.int64), np.array(codes, dtype=np.int64)
+
+    def __len__(self):
+        return sum(len(t[0]) for t in self.tables)
+
+    def get_codes(self, pc) -> np.ndarray:
+        """Section index of every PC (-1 for default)."""
+        pc = np.asarray(pc, dtype=np.int64)
+        codes = np.full(len(pc), -1, dtype=np.int64)
+        residue, k = pc % self.STEP, pc // self.STEP
+        for r, (starts, stops, sections) in enumerate(self.tables):
+            if not len(starts): continue
+            rows = np.flatnonzero(residue == r)
+            i = np.searchsorted(starts, k[rows], side="right") - 1
+            hit = (i >= 0) & (k[rows] < stops[i.clip(0)])
+            codes[rows[hit]] = sections[i[hit]]
+        return codes
+
+    def label(self, pc) -> np.ndarray:
+        """Section name of every PC."""
+        return self.names[self.get_codes(pc)]
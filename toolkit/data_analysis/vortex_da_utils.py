@@ -1,4 +1,8 @@
 import os
+import re
+import string
+import functools
+import numpy as np
 import pandas as pd
 
 from typing import OrderedDict
@@ -18,7 +22,7 @@ fname_info = {
     'workload'          : 'W'
 }
 
-#TODO merge this with templates.py
+#TODO merge this with templates.py (gen_df_from_fnames already decodes from the inputs/template.py STR templates)
 fname_info_gcnSynth = dict(fname_info)
 fname_info_gcnSynth.update({
     'workload'      : 8,
@@ -59,6 +63,84 @@ def gen_dict_from_fname(string, ref_dict):
             d[k] = int(v.replace(r,''))
     return d
 
+# Result file names are "_".join of the STR templates of inputs/template.py (ExperimentClass.make_result_fname),
+# for the keys of the experiment. The templates are compiled into one regex per app, so a whole listing is
+# decoded by a single vectorised str.extract instead of token by token with reverse dictionary lookups.
+FNAME_VALUE_RE = "[^_]+"
+
+def compile_fname_template(template, required=("ID",)):
+    """
+    Compiles a STR template ({key : token template}, e.g. {"ID" : '{ID}', "cores" : 'c{cores}', "l2cache" : "l2"})
+    into a regex with one named group per key. Keys not in required are optional (only added if in the experiment).
+    Returns (compiled regex, {key : True if the token has a value, False if it is a flag}).
+    """
+    tokens, kinds = [], {}
+    for k, tpl in template.items():
+        token, kinds[k] = "", False
+        for literal, field, _, _ in string.Formatter().parse(tpl):
+            token += re.escape(literal)
+            if field is not None:
+                token += "(?P<{}>{})".format(k, FNAME_VALUE_RE)
+                kinds[k] = True
+        if not kinds[k]: token = "(?P<{}>{})".format(k, token)
+        tokens.append((token, k in required))
+    pattern = ""
+    for i, (token, req) in enumerate(tokens):
+        token = token if i == 0 else "_" + token
+        pattern += token if req else "(?:{})?".format(token)
+    return re.compile("^" + pattern + "$"), kinds
+
+@functools.lru_cache(maxsize=None)
+def compile_app_fname_template(app):
+    from inputs.template import templateDict # relative to the repository root, like the experiment scripts
+    tpl = templateDict[app]
+    return compile_fname_template(tpl.STR, required=("ID",) + tuple(tpl.DICT.keys()))
+
+def convert_fname_values(values):
+    """Typed column of decoded strings (None for missing keys): int64 (Int64 if missing values), then float64, else str."""
+    s = pd.Series(values, dtype=object)
+    present = s.notna()
+    for dtype, nullable in (("int64", "Int64"), ("float64", "float64")):
+        try: conv = s[present].to_numpy(dtype=str).astype(dtype)
+        except ValueError: continue
+        if present.all(): return pd.Series(conv)
+        return pd.Series(conv, index=s.index[present]).reindex(s.index).astype(nullable)
+    return s.astype("str")
+
+def gen_df_from_fnames(fnames, app=None, template=None):
+    """
+    Decodes a list of result file names (or paths) into a DataFrame, one column per key of the STR template of app
+    (inputs/template.py), or of template if given. Values are typed like the checkpoint: integers when every value is
+    numeric (nullable if the key is optional), booleans for flags (e.g. l2cache), strings otherwise.
+    File names not matching the template are dropped with a warning.
+    """
+    regex, kinds = compile_fname_template(template) if template is not None else compile_app_fname_template(app)
+    keys = list(kinds.keys())
+    names = pd.Series([os.path.basename(f) for f in fnames], dtype=object)
+    # Names only differ by their leading ID for repeated configurations: with a leading required "{key}" token,
+    # the rest of the name is decoded once per distinct value and gathered back.
+    if keys and regex.pattern.startswith("^(?P<{}>{})_".format(keys[0], FNAME_VALUE_RE)):
+        split = names.str.split("_", n=1, expand=True).reindex(columns=[0, 1])
+        heads, tails = split[0], split[1]
+    else:
+        heads, tails = None, names
+    codes, uniques = pd.factorize(tails)
+    decoded = [regex.match(t if heads is None else "0_" + t) for t in uniques]
+    groups = [m.groups() if m is not None else (None,) * len(keys) for m in decoded]
+    matched = np.array([m is not None for m in decoded] + [False])[codes] # code -1 (no tail) picks the last False
+    if not matched.all():
+        print("WARNING: {} file names do not match the {} template.".format(int((~matched).sum()), app or "given"))
+    codes = codes[matched]
+    df = {}
+    for i, k in enumerate(keys):
+        if heads is not None and i == 0:
+            df[k] = convert_fname_values(heads[matched].to_numpy())
+            continue
+        values = pd.Series([g[i] for g in groups], dtype=object)
+        if not kinds[k]: df[k] = values.notna().to_numpy()[codes]
+        else: df[k] = convert_fname_values(values).take(codes).reset_index(drop=True)
+    return pd.DataFrame(df, columns=keys)
+
 log_info = ['instrs',
             'cycles', 
             'IPC', 
@@ -108,31 +190,85 @@ def remove_c_from_s(c,string):
     return s
 
 def gen_dict_from_logfile(path):
-    d = dict((k,None) for k in log_info)
     with open(path, "r") as log:
-        for l in log:
-            l = l.strip()
-            if "PERF:" in l:
-                if " core" in l: continue #Not implemented yet
-                else:
-                    split_l = l.split(" ")[1:] #I remove the PERF [1:]
-                    k = []
-                    k_prec = []
-                    #TODO percenteages don't work here
-                    for sl in (remove_c_from_s("(),",ssl) for ssl in split_l): #I clean the string from (),
-                        k.append(sl.split('=')[0])
-                        if "=" in sl:
-                            k = '_'.join(k)
-                            if sl.split('=')[1][-1] == '%': #percentage cases
-                                k = "_".join(k_prec.split("_")[:-1]) + "_" + k
-                                if k in log_info: d[k] = digit(sl.split("=")[1][:-1]) #I remove the % from the string
-                                else: print("Unknown key found:{}".format(k))
-                            else:
-                                if k in log_info: d[k] = digit(sl.split("=")[1])
-                                else: print("Unknown key found:{}".format(k))
-                            k_prec = k
-                            k=[]
-    return d
+        return gen_dict_from_lines(log)
+
+def gen_dict_from_lines(lines):
+    return parse_perf_text("\n".join(l.rstrip("\n") for l in lines))
+
+# PERF lines are parsed with precompiled patterns instead of being tokenised:
+#   PERF: <words>=<value>[%] [(<words>=<value>[%], ...)] [unit]
+#   PERF: core<N>: <same fields>
+# A percentage field takes the prefix of the previous key of the line, e.g. "icache read misses=198 (hit ratio=99%)"
+# gives icache_read_misses and icache_read_hit_ratio.
+# The PERF lines of a report are split around their values with a single regex: the text left between the values
+# (the layout of the report) is the same for every report of a simulator configuration, so the keys of the values
+# are derived once per layout (compile_perf_layout) and the values are then just zipped with them.
+PERF_LINE_RE = re.compile(r"PERF: (?!core\d+: )[^\n]*")
+PERF_CORE_LINE_RE = re.compile(r"PERF: core\d+: [^\n]*")
+PERF_VALUE_RE = re.compile(r"=([^\s,()%]+)")
+PERF_KEY_RE = re.compile(r"[A-Za-z][\w ]*$")
+PERF_CORE_RE = re.compile(r"PERF: core(\d+): ")
+PERF_KEYS = dict(zip(space_log_info, log_info))
+PERF_CORE_COLUMNS = ["core", "metric", "value"]
+
+@functools.lru_cache(maxsize=64)
+def compile_perf_layout(pieces):
+    """
+    Returns the (core, key) of every value of PERF lines split by PERF_VALUE_RE (pieces: the text around the values),
+    None for the values without key. core is "" for the aggregated lines.
+    """
+    ret = []
+    core, k_prec = "", ""
+    for i, piece in enumerate(pieces[:-1]):
+        if "\n" in piece: k_prec = ""
+        m = PERF_CORE_RE.search(piece)
+        if m is not None: core = m.group(1)
+        m = PERF_KEY_RE.search(piece)
+        if m is None: ret.append(None); continue
+        k = PERF_KEYS.get(m.group(0)) or m.group(0).replace(" ", "_")
+        if pieces[i + 1].startswith("%"): k = k_prec.rpartition("_")[0] + "_" + k
+        ret.append((core, k))
+        k_prec = k
+    return tuple(ret)
+
+def split_perf_lines(lines):
+    parts = PERF_VALUE_RE.split("\n".join(lines))
+    return compile_perf_layout(tuple(parts[0::2])), parts[1::2]
+
+def parse_perf_text(text, cores=False):
+    """
+    Parses the PERF lines of a report, returns the metrics dict with the log_info keys.
+    With cores=True returns (metrics dict, per-core rows [(core, metric, value string)]), see gen_core_df.
+    """
+    d = dict.fromkeys(log_info)
+    for key, v in zip(*split_perf_lines(PERF_LINE_RE.findall(text))):
+        if key is None: continue
+        if key[1] in d: d[key[1]] = float(v) if "." in v else int(v)
+        else: print("Unknown key found:{}".format(key[1]))
+    if not cores: return d
+    layout, values = split_perf_lines(PERF_CORE_LINE_RE.findall(text))
+    return d, [key + (v,) for key, v in zip(layout, values) if key is not None]
+
+def gen_core_df(core_rows, ID=None):
+    """Long-format table of per-core metrics (one row per core and metric) from the rows of parse_perf_text."""
+    df = pd.DataFrame(core_rows, columns=PERF_CORE_COLUMNS)
+    df["core"] = df["core"].astype("int64")
+    df["value"] = df["value"].astype("float64")
+    if ID is not None: df.insert(0, "ID", ID)
+    return df
+
+def read_report(path, fault_str=["INVALID EXPERIMENT"], cores=False):
+    """
+    Reads an experiment report once and returns (fault, metrics dict).
+    fault is 1 if one of the fault_str is in the report (metrics is then None), 0 otherwise.
+    With cores=True returns (fault, metrics dict, per-core rows of parse_perf_text).
+    """
+    with open(path, "rb") as f:
+        content = f.read()
+    if any(x.encode() in content for x in fault_str): return (1, None, None) if cores else (1, None)
+    text = content.decode()
+    return (0,) + parse_perf_text(text, cores=True) if cores else (0, parse_perf_text(text))
 
 def gen_dict_from_log(path):
     fname = path.split("/")[-1]
@@ -140,8 +276,11 @@ def gen_dict_from_log(path):
     dl["ID"] = int(fname.split("_")[fname_info["ID"]])
     return dl
 
-def gen_df_from_log(path):
-    return pd.DataFrame(gen_dict_from_log(path),index=[0])
+def gen_df_from_log(path, dl=None):
+    if dl is None: return pd.DataFrame(gen_dict_from_log(path),index=[0])
+    dl = dict(dl)
+    dl["ID"] = int(path.split("/")[-1].split("_")[fname_info["ID"]])
+    return pd.DataFrame(dl,index=[0])
 
 def vortex_fault_handler(path):
     with open("fauty.txt","a") as f:
@@ -2,8 +2,26 @@ import subprocess as sp
 import os
 import shlex
 import traceback
+import array
+import math
+import re
+import gzip
+import signal
+import time
+import queue
+import threading
+import functools
+import hashlib
+import multiprocessing as mp
+from collections import OrderedDict
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
 
 from . import experiments as exs
 
@@ -13,46 +31,191 @@ from . import experiments as exs
 # implement timers
 # implement trace analysis child class
 
+RUNNING_COMMANDS = set() # parsers whose command is running, see abort_running_commands
+
+class LogWriterClass(object):
+    """
+    Writes the raw lines of a command to a log file from a background thread, optionally gzip/zstd compressed.
+    Lines are queued in blocks, so the parsing thread only pays for a list append.
+    Constructor arguments:
+        path : str          - log file path, the compression extension (.gz, .zst) is appended
+        compression : str   - None, "gzip" or "zstd" (zstd needs the zstandard package)
+        block_size : int    - number of lines per queued block
+        max_blocks : int    - queue length, the parsing thread blocks if the writer falls behind
+    Methods:
+        write               - queues a line
+        close               - flushes the queue and closes the file
+    A write error of the writer thread (e.g. disk full) is kept in error, the thread keeps draining the queue so the
+    parsing thread never blocks on it, and the error is raised by the next write or by close.
+    """
+    EXTENSIONS = {None : "", "gzip" : ".gz", "zstd" : ".zst"}
+
+    def __init__(self, path : str, compression : str = None, block_size : int = 1024, max_blocks : int = 64):
+        if compression not in self.EXTENSIONS: raise ValueError("Unknown compression: {}".format(compression))
+        self.path = path + self.EXTENSIONS[compression]
+        self.file = self.open_file(self.path, compression)
+        self.block_size = block_size
+        self.block = []
+        self.queue = queue.Queue(maxsize=max_blocks)
+        self.error = None
+        self.thread = threading.Thread(target=self.writer_loop, daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def open_file(path, compression):
+        if compression == "gzip":
+            return gzip.open(path, "wt", compresslevel=3)
+        elif compression == "zstd":
+            if zstd is None: raise ImportError("zstd compression needs the zstandard package.")
+            return zstd.open(path, "wt")
+        return open(path, "w")
+
+    def writer_loop(self):
+        for block in iter(self.queue.get, None):
+            if self.error is not None: continue
+            try:
+                self.file.writelines(block)
+            except Exception as e:
+                self.error = e
+        try:
+            self.file.close()
+        except Exception as e:
+            if self.error is None: self.error = e
+
+    def write(self, line):
+        if self.error is not None: raise self.error
+        self.block.append(line)
+        if len(self.block) >= self.block_size:
+            self.queue.put(self.block)
+            self.block = []
+
+    def close(self):
+        if self.block and self.error is None: self.queue.put(self.block)
+        self.block = []
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None: raise self.error
+
+def open_log(path : str):
+    """Opens a saved command log for reading, gzip/zstd compressed according to its extension (.gz, .zst)."""
+    if path.endswith(LogWriterClass.EXTENSIONS["gzip"]):
+        return gzip.open(path, "rt")
+    elif path.endswith(LogWriterClass.EXTENSIONS["zstd"]):
+        if zstd is None: raise ImportError("zstd compressed logs need the zstandard package.")
+        return zstd.open(path, "rt")
+    return open(path, "r")
+
+class PipePumpClass(object):
+    """
+    Reads a pipe on a background thread into a bounded queue, so that stdout and stderr of a command are drained concurrently.
+    Lines are queued in blocks; iterating over the pump yields the lines until the pipe is closed.
+    Constructor arguments:
+        stream              - text stream to read (e.g. process.stdout)
+        block_size : int    - number of lines per queued block
+        max_blocks : int    - queue length, the reader blocks (and so does the command) if the consumer falls behind
+    Attributes:
+        last_activity       - time.monotonic() of the last line read from the pipe
+    """
+    def __init__(self, stream, block_size : int = 256, max_blocks : int = 64):
+        self.stream = stream
+        self.block_size = block_size
+        self.queue = queue.Queue(maxsize=max_blocks)
+        self.last_activity = time.monotonic()
+        self.thread = threading.Thread(target=self.reader_loop, daemon=True)
+        self.thread.start()
+
+    def reader_loop(self):
+        block = []
+        try:
+            for line in self.stream:
+                self.last_activity = time.monotonic()
+                block.append(line)
+                if len(block) >= self.block_size:
+                    self.queue.put(block)
+                    block = []
+        finally:
+            if block: self.queue.put(block)
+            self.queue.put(None)
+
+    def __iter__(self):
+        for block in iter(self.queue.get, None):
+            yield from block
+        self.queue.put(None) # later iterations (e.g. a drain after an error) end immediately
+
 class StreamParsingClass(object):
     """
     Base class for parsing the stream of data coming from a command.
     This class should be inherited by a child class, which implements specific parsing logic depending on the command.
     Constructor arguments:
         output_path : str   - path to the output directory
-        timeout : int       - timeout for the command
+        timeout : int       - wall-clock limit of the command in seconds (0: no limit)
+        idle_timeout : int  - limit in seconds without any new stdout line, neither read from the pipe nor parsed (0: no limit)
+        capture : str       - raw output capture policy for process.log: "all", "filtered" (only lines
+                              accepted by capture_filter, e.g. no trace lines) or "off"
+        compression : str   - None, "gzip" or "zstd": compression of process.log (written on a background thread)
     Methods:
         run                                 - runs the command and parses the output
-        run_command                         - runs the command
+        replay(log_path)                    - parses a saved log (plain, .gz or .zst) through the same reducers, without running the command
+        run_command                         - runs the command, stdout and stderr are pumped concurrently by PipePumpClass threads
         parse                               - parses the output line by line 
         parse_line                          - parses a single line of the output
         reduce_func                         - process the line of the output   (must be implemented in the child class and assigned in the constructor)
-        sterr_process_func                  - process the stderr stream        (must be implemented in the child class and assigned in the constructor)
+        sterr_process_func                  - process the stderr stream        (must be implemented in the child class and assigned in the constructor,
+                                                                                runs on its own thread while stdout is parsed)
         make_stderr_process_func_arg_dict   - returns a dictionary of arguments for the stderr_process_func method                  (to be overridden)
         make_command                        - creates the command to be run from self.cmd_arg_dict, which must be construceted in the child constructor
         print_command                       - prints the command to be run
         cmd_exception_handler               - handles the exception raised by the command                                           (to be overridden)
         program_exception_handler           - handles the exception raised by this program (e.g. when there is a bug in the code)
-        set_timer                           - sets the timer for the command
-        
+        set_timer                           - starts the watchdog thread enforcing timeout and idle_timeout
+        reset_timer                         - restarts the idle limit, called for each parsed line (lines read from the pipe restart it too)
+        stop_timer                          - stops the watchdog thread
+        capture_filter(line)                - returns True if the line is kept in "filtered" capture mode                          (to be overridden)
+        set_line_rules(rules)               - declares how lines are filtered and routed, compiled into a dispatch table (see below)
+        route_line(line)                    - returns the handler of the line from the dispatch table, None if the line is dropped
+
         is_exeption(line)                   - returns True if the line is an exception, False otherwise                             (to be overridden)
+    Line rules:
+        Child classes call set_line_rules with an ordered list of (matcher, handler) pairs, the first matching rule wins:
+            str matcher         - prefix of the line ("" matches every line), consecutive prefix rules are merged into
+                                  one dictionary lookup per prefix length
+            re.Pattern matcher  - the line matches the pattern (re.match)
+            callable matcher    - the predicate returns True (may update parsing state, e.g. the current section)
+        handler is called with the line, or None to drop it. Lines matching no rule are dropped.
+        Without line rules, lines go through exceptions_list / is_exeption and then reduce_func.
     """
-    def __init__(self, output_path : str, timeout : int = 0):
+    CAPTURE_POLICIES = ("all", "filtered", "off")
+    TIMEOUT_RETCODE = 124 # as coreutils timeout, returned when the watchdog kills the command
+    WATCHDOG_PERIOD = 1.0 # seconds
+
+    def __init__(self, output_path : str, timeout : int = 0, capture : str = "all", compression : str = None,
+                        idle_timeout : int = 0):
         # mandatory constructor arguments
         self.output_path = output_path if output_path[-1] == "/" else output_path + "/"
         assert self.output_path != None, "Path is not specified"
 
         # optional constructor arguments
         self.timeout = timeout  # in seconds
+        self.idle_timeout = idle_timeout
+        self.timeout_reason = None
+        self.watchdog = None
+        self.process = None
+        if capture not in self.CAPTURE_POLICIES: raise ValueError("capture must be one of: {}".format(self.CAPTURE_POLICIES))
+        self.capture = capture
+        self.compression = compression
 
         # other attributes
         self.stderr_log_file = self.output_path + "process.stderr.log"
         self.log_file = self.output_path + "process.log"
         self.save_to_file = True
+        self.log_writer = None
+        self.capture_error = None
         self.CMD_TEMPLATE = ""
         self.command = ""
 
         self.cmd_arg_dict = {}
         self.exceptions_list = []
+        self.dispatch_table = None
         self.reduce_func = self.dummy_reduce_func
         self.sterr_process_func = self.base_stderr_process_func
 
@@ -73,7 +236,7 @@ class StreamParsingClass(object):
     # ad-hoc methods for child classes, to be overridden if needed
     def make_stderr_process_func_arg_dict(self):
         d = {"out_file_path" : self.stderr_log_file,
-             "stderr_stream" : self.process.stderr}
+             "stderr_stream" : self.stderr_pump}
         return d
 
     def print_command(self):
@@ -83,9 +246,29 @@ class StreamParsingClass(object):
     def make_command(self):
         self.command = self.CMD_TEMPLATE.format(**self.cmd_arg_dict)
 
+    def open_capture(self):
+        if self.save_to_file and self.capture != "off":
+            self.log_writer = LogWriterClass(self.log_file, compression=self.compression)
+
+    def capture_line(self, line):
+        if self.capture == "all" or self.capture_filter(line):
+            self.log_writer.write(line)
+
+    def close_capture(self):
+        """Closes the log, a write error of the log is kept in capture_error (raised at the end of run)."""
+        if self.log_writer is None: return
+        writer, self.log_writer = self.log_writer, None
+        try:
+            writer.close()
+        except Exception as e:
+            if self.capture_error is None: self.capture_error = e
+
+    def capture_filter(self, line):
+        if self.dispatch_table is not None: return self.route_line(line) is None
+        return self.is_exeption(line)
+
     def run_command(self):
-        if self.save_to_file:
-            self.dump_file = open(self.log_file, "w")
+        self.open_capture()
         self.make_command()
         self.print_command()
         """ Quick and dirty hack to handle environment variables in the command."""
@@ -104,29 +287,132 @@ class StreamParsingClass(object):
                                     stderr=sp.PIPE,
                                     env=self.env,
                                     text=True,
-                                    universal_newlines=True)
+                                    universal_newlines=True,
+                                    start_new_session=True) # own process group, so the watchdog can kill the whole simulation
+        RUNNING_COMMANDS.add(self)
+        self.stdout_pump = PipePumpClass(self.process.stdout)
+        self.stderr_pump = PipePumpClass(self.process.stderr)
+        self.stderr_thread = threading.Thread(target=self.stderr_loop, daemon=True)
+        self.stderr_thread.start()
+
+    def stderr_loop(self):
+        try:
+            self.sterr_process_func(**self.make_stderr_process_func_arg_dict())
+        except Exception as e:
+            self.program_exception_handler(e)
+            for _ in self.stderr_pump: pass
         
     def set_timer(self):
-        if self.timeout is None: return
+        self.start_time = self.last_line_time = time.monotonic()
+        if not self.timeout and not self.idle_timeout: return
+        self.watchdog_stop = threading.Event()
+        self.watchdog = threading.Thread(target=self.watchdog_loop, daemon=True)
+        self.watchdog.start()
 
     def reset_timer(self):
-        if self.timeout is None: return
+        self.last_line_time = time.monotonic()
+
+    def stop_timer(self):
+        if self.watchdog is None: return
+        self.watchdog_stop.set()
+        self.watchdog.join()
+        self.watchdog = None
+
+    def check_timer(self):
+        now = time.monotonic()
+        if self.timeout and now - self.start_time > self.timeout: return "wall-clock"
+        # a line read by the pump (even if the parser is busy) or parsed (even if the pump waits on a full queue)
+        last_line_time = max(self.last_line_time, self.stdout_pump.last_activity)
+        if self.idle_timeout and now - last_line_time > self.idle_timeout: return "idle"
+        return None
+
+    def watchdog_loop(self):
+        period = min(t for t in (self.timeout, self.idle_timeout, self.WATCHDOG_PERIOD) if t) / 4
+        while not self.watchdog_stop.wait(period):
+            reason = self.check_timer()
+            if reason is None: continue
+            self.timeout_reason = reason
+            self.kill_process_group()
+            return
+
+    def kill_process_group(self):
+        print("Command exceeded its {} limit, killing it.".format(self.timeout_reason))
+        self.signal_process_group()
+
+    def signal_process_group(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def abort_command(self):
+        """Kills and reaps the command when run is left abruptly (e.g. Ctrl-C), its own session doesn't get the signal."""
+        if self.process is None or self.process.poll() is not None: return
+        print("Run interrupted, killing the command.")
+        self.signal_process_group()
+        self.process.wait()
 
     def is_exeption(self, line):
         for exeption in self.exceptions_list:
             if exeption(line):  return True
         return False
 
+    def set_line_rules(self, rules : list):
+        self.dispatch_table = self.compile_line_rules(rules)
+        if len(self.dispatch_table) == 1 and len(self.dispatch_table[0][1]) == 1:
+            # prefixes of a single length only (e.g. TRACE/DEBUG): one slice and one dictionary lookup per line
+            length, prefixes = self.dispatch_table[0][1][0]
+            self.route_line = lambda line: prefixes.get(line[:length])
+        elif "route_line" in self.__dict__:
+            del self.route_line
+
+    @staticmethod
+    def compile_line_rules(rules : list):
+        """Compiles (matcher, handler) rules into a list of stages: ("prefix", [(length, {prefix : handler})]), ("pattern", regex, handler) or ("test", predicate, handler)."""
+        table = []
+        for matcher, handler in rules:
+            if isinstance(matcher, str):
+                if not table or table[-1][0] != "prefix": table.append(("prefix", {}))
+                table[-1][1].setdefault(len(matcher), {}).setdefault(matcher, handler) # first rule wins
+            elif isinstance(matcher, re.Pattern):
+                table.append(("pattern", matcher, handler))
+            elif callable(matcher):
+                table.append(("test", matcher, handler))
+            else:
+                raise TypeError("Unsupported line rule matcher: {}".format(matcher))
+        # longest prefixes first
+        return [("prefix", sorted(stage[1].items(), reverse=True)) if stage[0] == "prefix" else stage for stage in table]
+
+    def route_line(self, line):
+        for stage in self.dispatch_table:
+            if stage[0] == "prefix":
+                for length, prefixes in stage[1]:
+                    key = line[:length]
+                    if key in prefixes: return prefixes[key]
+            elif stage[0] == "pattern":
+                if stage[1].match(line): return stage[2]
+            elif stage[1](line): return stage[2]
+        return None
+
     def parse_line(self, line):
-        if self.is_exeption(line): return
-        self.reduce_func(line)
+        if self.dispatch_table is None:
+            if self.is_exeption(line): return
+            self.reduce_func(line)
+            return
+        handler = self.route_line(line)
+        if handler is not None: handler(line)
     
     def parse(self):
         self.set_timer()
-        for line in self.process.stdout:
-            if self.save_to_file: self.dump_file.write(line)
+        for line in self.stdout_pump:
+            if self.log_writer is not None: self.capture_line(line)
             self.reset_timer()
             self.parse_line(line)
+
+    def drain_stdout(self):
+        """Consumes what is left of stdout (e.g. after a parsing error) so the command can't block on a full pipe."""
+        for line in self.stdout_pump:
+            if self.log_writer is not None: self.capture_line(line)
     
     @staticmethod
     def program_exception_handler(e):
@@ -139,21 +425,135 @@ class StreamParsingClass(object):
         print("An error occurred with retcode: {}. Check STDERR. Exiting...".format(r))
     
     def run(self):
-        try :
-            self.run_command()
-            self.parse()
-        except Exception as e:
-            self.program_exception_handler(e)
-        ret = self.process.wait()
-        self.sterr_process_func(**self.make_stderr_process_func_arg_dict())
+        try:
+            try :
+                self.run_command()
+                self.parse()
+            except Exception as e:
+                self.program_exception_handler(e)
+                if self.log_writer is not None and self.log_writer.error is not None: self.close_capture() # broken log
+                if hasattr(self, "stdout_pump"): self.drain_stdout()
+            self.stop_timer()
+            self.close_capture()
+            ret = self.process.wait()
+            self.stderr_thread.join()
+        except BaseException:
+            self.abort_command()
+            self.stop_timer()
+            self.close_capture()
+            raise
+        finally:
+            RUNNING_COMMANDS.discard(self)
+        if self.capture_error is not None: raise self.capture_error
+        if self.timeout_reason is not None: ret = self.TIMEOUT_RETCODE
         if ret != 0:
             self.cmd_exception_handler(ret)
         return ret
 
+    def replay(self, log_path : str):
+        try:
+            with open_log(log_path) as f:
+                for line in f: self.parse_line(line)
+        except Exception as e:
+            return self.program_exception_handler(e)
+        return 0
+
     def __str__(self) -> str:
         raise NotImplementedError
 
 
+def abort_running_commands():
+    """Kills the commands still running, for a caller interrupted while other threads run them (e.g. launch.py)."""
+    for parser in list(RUNNING_COMMANDS): parser.abort_command()
+
+
+class ColumnBufferClass(object):
+    """
+    Typed, append-only column store used to accumulate parsed rows without growing a DataFrame line by line.
+    Numeric columns are kept in array.array buffers, string columns are dictionary encoded (codes in an array.array).
+    The content is converted to pyarrow record batches only once, chunk_size rows at a time.
+    Rows are addressed by a global row index, which stays valid after the oldest rows are popped with pop_batch.
+    Constructor arguments:
+        schema : OrderedDict    - column name -> type code ("q": int64, "Q": uint64, "d": float64, "U": string)
+        chunk_size : int        - number of rows per record batch when converting
+    Methods:
+        append                  - appends a row (dict) and returns its index, missing keys get the column default (-1, NaN or None)
+        get / set               - random access to a single cell
+        pop_batch               - removes the n oldest rows and returns them as a pyarrow.RecordBatch
+        to_table                - returns the content as a pyarrow.Table
+        to_df                   - returns the content as a pandas.DataFrame
+    """
+    DEFAULTS = {"q" : -1, "Q" : 0, "d" : float("nan"), "U" : None}
+    NUMPY_TYPES = {"q" : np.int64, "Q" : np.uint64, "d" : np.float64}
+    ARROW_TYPES = {"q" : pa.int64(), "Q" : pa.uint64(), "d" : pa.float64(), "U" : pa.string()}
+
+    def __init__(self, schema : OrderedDict, chunk_size : int = 1 << 16):
+        for t in schema.values():
+            if t not in self.DEFAULTS: raise ValueError("Unsupported column type: {}".format(t))
+        self.schema = OrderedDict(schema)
+        self.chunk_size = chunk_size
+        self.offset = 0 # rows already popped
+        self.cols = OrderedDict((k, array.array("q" if t == "U" else t)) for k, t in self.schema.items())
+        self.str_codes = {k : {} for k, t in self.schema.items() if t == "U"}
+        self.str_values = {k : [] for k, t in self.schema.items() if t == "U"}
+
+    def __len__(self):
+        return len(self.cols[next(iter(self.cols))]) if self.cols else 0
+
+    def get_arrow_schema(self):
+        return pa.schema([(k, self.ARROW_TYPES[t]) for k, t in self.schema.items()])
+
+    def encode(self, col, value):
+        codes = self.str_codes[col]
+        code = codes.get(value)
+        if code is None:
+            code = len(self.str_values[col])
+            codes[value] = code
+            self.str_values[col].append(value)
+        return code
+
+    def append(self, d : dict):
+        for k, t in self.schema.items():
+            v = d.get(k, self.DEFAULTS[t])
+            self.cols[k].append(self.encode(k, v) if t == "U" else v)
+        return self.offset + len(self) - 1
+
+    def get(self, row, col):
+        v = self.cols[col][row - self.offset]
+        return self.str_values[col][v] if self.schema[col] == "U" else v
+
+    def set(self, row, col, value):
+        self.cols[col][row - self.offset] = self.encode(col, value) if self.schema[col] == "U" else value
+
+    def make_arrow_column(self, col, start, stop):
+        t = self.schema[col]
+        # copy, a live numpy view would lock the array.array against resizing
+        values = np.frombuffer(self.cols[col], dtype=self.NUMPY_TYPES.get(t, np.int64),
+                               count=stop-start, offset=start*self.cols[col].itemsize).copy()
+        if t == "U":
+            dictionary = pa.array(self.str_values[col], type=pa.string())
+            return dictionary.take(pa.array(values))
+        return pa.array(values, type=self.ARROW_TYPES[t], from_pandas=True)
+
+    def make_batch(self, start, stop):
+        return pa.RecordBatch.from_arrays([self.make_arrow_column(k, start, stop) for k in self.schema],
+                                          schema=self.get_arrow_schema())
+
+    def pop_batch(self, n):
+        n = min(n, len(self))
+        batch = self.make_batch(0, n)
+        for c in self.cols.values(): del c[:n]
+        self.offset += n
+        return batch
+
+    def to_table(self):
+        n = len(self)
+        batches = [self.make_batch(i, min(i + self.chunk_size, n)) for i in range(0, n, self.chunk_size)]
+        return pa.Table.from_batches(batches, schema=self.get_arrow_schema())
+
+    def to_df(self):
+        return self.to_table().to_pandas()
+
 class LsStreamParsingClass(StreamParsingClass):
     """
     Child class of StreamParsingClass for parsing the output of the ls command.
@@ -225,11 +625,65 @@ class LsStreamParsingClass(StreamParsingClass):
     def __str__(self) -> str:
         return str(self.df)
  
+# Vortex simx line decoders, e.g.:
+#   DEBUG warp.cpp:62: Fetch: coreid=0, wid=1, tmask=0011, PC=0x80000004 (#5)
+#   TRACE 1061: pipeline-commit: coreid=0, wid=1, PC=0x80000004, ex=ALU, tmask=0011, (#5)
+VX_FETCH_RE         = re.compile(r"coreid=(\d+), wid=(\d+), tmask=([^\s,]+), PC=(0x([0-9a-fA-F]+))(,?).*?\(#(\d+)\)")
+VX_FETCH_FIELD_RE   = re.compile(r"(coreid|wid|tmask|PC)=((?:0x)?([^\s,]+))(,?)|\(#(\d+)\)")
+VX_SHARD_RE         = re.compile(r"coreid=(\d+), wid=(\d+)")
+VX_TRACE_RE         = re.compile(r"TRACE (\d+): pipeline-(schedule|commit):.*\(#(\d+)\)")
+# codec of the streamed .feather trace, depending on the pyarrow build
+VX_TRACE_COMPRESSION = next((c for c in ("lz4", "zstd") if pa.Codec.is_available(c)), None)
+
 class VortexTraceAnalysisClass(StreamParsingClass):
+    """
+    Child class of StreamParsingClass that runs a Vortex experiment with debug=3 and reduces its DEBUG/TRACE lines
+    into one row per instruction (see TRACE_SCHEMA), saved as <output_file>.feather.
+    Constructor arguments:
+        output_file : str               - output file path, without the .feather extension
+        args : dict / exp : ExperimentClass - the experiment to run (one of the two, exp=None when only replaying logs)
+        batch_size : int                - if > 0, completed rows are appended to the .feather file (Arrow IPC) in record
+                                          batches of this size while parsing, so memory is bounded by the rows in flight
+                                          (fetched but not committed yet) instead of the whole trace. Only committed
+                                          prefixes of the trace are written, so the file matches the non-streaming one.
+                                          The file footer is written when parsing ends (also when the simulator crashes
+                                          or times out): the file is not readable if this process itself is killed.
+                                          self.df is left empty in this mode.
+        max_pending_rows : int          - with batch_size, cap on the buffered rows (0: no cap). Beyond it the oldest rows
+                                          are written before their commit (NaN total-exec-time), with a warning; their
+                                          late schedule/commit events are dropped and counted in late_events.
+        n_workers : int                 - if > 1, lines are split by coreid/wid and decoded by this many worker
+                                          processes, each building a partial table; partials are merged back in the serial row order at the end.
+                                          Not compatible with batch_size. A worker raising or dying makes run/replay
+                                          raise RuntimeError instead of waiting for it.
+        timeout / idle_timeout : int    - watchdog limits (see StreamParsingClass); a killed run returns TIMEOUT_RETCODE
+                                          and keeps the rows parsed so far.
+        capture / compression : str     - capture policy of the raw output, saved as <output_file>.log (see StreamParsingClass)
+                                          and replayed with replay_trace_log
+    """
+    # columns of the trace dataframe (.feather), in output order
+    # tmask is the thread mask as a bitmask (bit i: thread i, the rightmost digit of the printed mask)
+    TRACE_SCHEMA = OrderedDict([("core",             "q"),
+                                ("warp",             "q"),
+                                ("tmask",            "Q"),
+                                ("PC",               "q"),
+                                ("PC-id",            "U"),
+                                ("eID",              "q"),
+                                ("instr",            "U"),
+                                ("schedule-stmp",    "d"),
+                                ("total-exec-time",  "d")])
+
     def __init__(self, output_file: str, timeout: int = 0,
-                        args: dict = {}, exp : exs.ExperimentClass = exs.ExperimentClass({})):
+                        args: dict = {}, exp : exs.ExperimentClass = exs.ExperimentClass({}),
+                        batch_size : int = 0, n_workers : int = 1,
+                        capture : str = "all", compression : str = None, idle_timeout : int = 0,
+                        max_pending_rows : int = 0):
         self.output_file = output_file + ".feather"
-        super().__init__(os.path.dirname(self.output_file), timeout)
+        super().__init__(os.path.dirname(self.output_file), timeout, capture=capture, compression=compression,
+                         idle_timeout=idle_timeout)
+        # one log per experiment, the experiments of a run share the output directory
+        self.log_file = output_file + ".log"
+        self.stderr_log_file = output_file + ".stderr.log"
         if args:
             args['debug'] = 3 # add debug flag!
             self.cmd_arg_dict.update(args)
@@ -239,28 +693,62 @@ class VortexTraceAnalysisClass(StreamParsingClass):
             self.experiment = exp
             self.experiment.update_key("debug", 3)
         else:
-            raise ValueError("Either args or exp must be provided.")
-        self.exceptions_list = [self.is_not_trace]
-        self.reduce_func = self.vx_trace_reduce_func
+            self.experiment = None # replay only
+        self.set_line_rules(self.trace_line_rules())
+        self.df = pd.DataFrame({})
+        self.init_trace_state(batch_size, max_pending_rows)
+
+        # sharded decoding
+        if n_workers > 1 and batch_size: raise ValueError("n_workers and batch_size can't be used together.")
+        self.n_workers = n_workers
+        self.shard_batch_size = 4096 # lines sent to a worker at once
+        self.workers = []
+        if self.n_workers > 1: self.set_line_rules(self.shard_line_rules())
 
+    def init_trace_state(self, batch_size : int = 0, max_pending_rows : int = 0):
+        """Reduction state, shared by the main parser and the shard workers."""
         self.iter_dict = {}
-        self.df = pd.DataFrame({})
+        self.buffer = ColumnBufferClass(self.TRACE_SCHEMA)
+
+        # eID -> buffer row, plus events seen before the row they refer to
+        self.eid_index = {}
+        self.pending_schedules = {}
+        self.pending_commits = {}
+        self.unmatched_commits = 0
+
+        # streaming output
+        self.batch_size = batch_size
+        self.max_pending_rows = max_pending_rows # rows waiting for a commit before being written anyway (0: no cap)
+        self.frontier = 0 # first row (buffer index) not committed yet
+        self.writer = None
+        self.evicted = set() # eIDs written before their commit
+        self.late_events = 0
+
+    @classmethod
+    def make_shard_reducer(cls):
+        """Bare instance (no command, no output file) used by the shard workers to reduce their lines."""
+        reducer = cls.__new__(cls)
+        reducer.init_trace_state()
+        reducer.set_line_rules(reducer.trace_line_rules())
+        return reducer
+
+    def trace_line_rules(self):
+        # everything else (PERF, simulator chatter) is dropped
+        return [("TRACE", self.reduce_trace),
+                ("DEBUG", self.reduce_debug)]
+
+    def shard_line_rules(self):
+        return [("TRACE", self.shard_trace_line),
+                ("DEBUG", self.shard_debug_line)]
 
     @staticmethod
-    def is_not_trace(line):
-        if      line.startswith("TRACE"): return False
-        elif    line.startswith("DEBUG"): return False
-        elif    line.startswith("PERF"):  return False
-        else: return True
+    def capture_filter(line):
+        return not (line.startswith("TRACE") or line.startswith("DEBUG"))
 
     def make_command(self):
+        if self.experiment is None: raise ValueError("Either args or exp must be provided to run the simulation.")
         self.command = self.experiment.get_cmd_str()
 
-    def make_stderr_process_func_arg_dict(self):
-        d = super().make_stderr_process_func_arg_dict()
-        d["stdout_stream"] = self.process.stdout
-        return d
-
     @staticmethod
     def get_instr_dict(lline):
         d = {}
@@ -279,7 +767,7 @@ class VortexTraceAnalysisClass(StreamParsingClass):
             elif l.startswith("(#"):
                 d["eID"]    = int(l[2:-1])
             elif l.startswith("tmask="):
-                d["tmask"]  = l.split("=")[1][:-1]
+                d["tmask"]  = int(l.split("=")[1][:-1], base=2)
             else:
                 pass
         return d
@@ -292,68 +780,401 @@ class VortexTraceAnalysisClass(StreamParsingClass):
         d.update(VortexTraceAnalysisClass.get_instr_dict(lline[2:]))
         return d
 
+    @staticmethod
+    def decode_fetch_line(line):
+        """
+        Single-pass equivalent of get_instr_dict(line.split()[2:]) for a "Fetch:" line.
+        Falls back to a field by field scan if the fields are not in the usual order.
+        """
+        m = VX_FETCH_RE.search(line)
+        if m is not None:
+            core, warp, tmask, PC, PC_digits, comma, eID = m.groups()
+            return {"core" : int(core), "warp" : int(warp), "tmask" : int(tmask, base=2),
+                    "PC" : int(PC_digits, base=16), "PC-id" : PC_digits if comma else PC, "eID" : int(eID)}
+        d = {}
+        for k, v, digits, comma, eID in VX_FETCH_FIELD_RE.findall(line):
+            if eID:                 d["eID"]    = int(eID)
+            elif k == "coreid":     d["core"]   = int(v)
+            elif k == "wid":        d["warp"]   = int(v)
+            elif k == "tmask":      d["tmask"]  = int(v, base=2)
+            else:
+                d["PC"]     = int(digits, base=16)
+                d["PC-id"]  = digits if comma else v
+        return d
+
+    @staticmethod
+    def decode_trace_line(line):
+        """
+        Returns (event, {"time-stmp", "eID"}) for a pipeline-schedule/commit TRACE line, None for other TRACE lines.
+        """
+        m = VX_TRACE_RE.match(line)
+        if m is None: return None
+        return m.group(2), {"time-stmp" : int(m.group(1)), "eID" : int(m.group(3))}
+
     def register_schedule(self, d):
-        self.df.loc[self.df["eID"] == d["eID"], "schedule-stmp"] = d["time-stmp"]
+        eID = d["eID"]
+        row = self.eid_index.get(eID)
+        if row is None:
+            if eID in self.evicted:
+                self.late_events += 1
+                return
+            self.pending_schedules[eID] = d["time-stmp"]
+            return
+        self.buffer.set(row, "schedule-stmp", d["time-stmp"])
+        if eID in self.pending_commits:
+            self.set_exec_time(row, self.pending_commits.pop(eID))
 
     def register_commit(self, d):
-        schedule_stmp = self.df.loc[self.df["eID"] == d["eID"], "schedule-stmp"].values[0]
-        commit_stmp = d["time-stmp"]
-        self.df.loc[self.df["eID"] == d["eID"], "total-exec-time"] = commit_stmp - schedule_stmp
+        eID = d["eID"]
+        row = self.eid_index.get(eID)
+        if row is None and eID in self.evicted:
+            self.late_events += 1
+            return
+        if row is None or math.isnan(self.buffer.get(row, "schedule-stmp")): # commit seen before its schedule
+            self.pending_commits[eID] = d["time-stmp"]
+            return
+        self.set_exec_time(row, d["time-stmp"])
+
+    def set_exec_time(self, row, commit_stmp):
+        schedule_stmp = self.buffer.get(row, "schedule-stmp")
+        self.buffer.set(row, "total-exec-time", commit_stmp - schedule_stmp)
+        if self.batch_size: self.stream_rows()
+
+    # ------------------------ STREAMING OUTPUT ---------------- #
+    def write_batch(self, n):
+        for eID in self.buffer.cols["eID"][:n]: self.eid_index.pop(eID, None)
+        batch = self.buffer.pop_batch(n)
+        # the footer is only written by close_stream: pa.ipc.new_stream would be readable earlier, but not as .feather
+        if self.writer is None:
+            self.writer = pa.ipc.new_file(self.output_file, batch.schema,
+                                          options=pa.ipc.IpcWriteOptions(compression=VX_TRACE_COMPRESSION))
+        self.writer.write_batch(batch)
+
+    def stream_rows(self):
+        """
+        Writes out the oldest rows once batch_size of them are committed (rows keep the parsing order).
+        With max_pending_rows, rows still waiting for a commit are written anyway when more are buffered.
+        """
+        end = self.buffer.offset + len(self.buffer)
+        self.frontier = max(self.frontier, self.buffer.offset)
+        while self.frontier < end and not math.isnan(self.buffer.get(self.frontier, "total-exec-time")):
+            self.frontier += 1
+        while self.frontier - self.buffer.offset >= self.batch_size:
+            self.write_batch(self.batch_size)
+        if self.max_pending_rows and len(self.buffer) > self.max_pending_rows:
+            self.evict_rows(len(self.buffer) - self.max_pending_rows)
+
+    def evict_rows(self, n):
+        """Writes the n oldest rows, committed or not, the uncommitted ones keep a NaN total-exec-time."""
+        exec_time = self.buffer.cols["total-exec-time"][:n]
+        evicted = [eID for eID, t in zip(self.buffer.cols["eID"][:n], exec_time) if math.isnan(t)]
+        if evicted and not self.evicted:
+            print("WARNING: more than {} rows waiting for a commit, writing them without it (see max_pending_rows).".format(self.max_pending_rows))
+        self.evicted.update(evicted)
+        for eID in evicted: # commits waiting for the schedule of the row
+            if self.pending_commits.pop(eID, None) is not None: self.late_events += 1
+        self.write_batch(n)
+
+    def close_stream(self):
+        while len(self.buffer):
+            self.write_batch(self.batch_size)
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+    # ---------------------------------------------------------- #
 
     def reduce_trace(self, line):
-        if "pipeline-schedule:" in line:
-            self.register_schedule(self.get_trace_line_dict(line))
-        elif "pipeline-commit:" in line:
-            self.register_commit(self.get_trace_line_dict(line))
+        event = self.decode_trace_line(line)
+        if event is None: return
+        if event[0] == "schedule":
+            self.register_schedule(event[1])
         else:
-            pass
+            self.register_commit(event[1])
 
     def register_new_instruction(self):
-        self.df = pd.concat([self.df, pd.DataFrame(self.iter_dict, index=[0])], ignore_index=True)
+        eID = self.iter_dict.get("eID")
+        row = self.buffer.append(self.iter_dict)
+        if eID is not None:
+            self.eid_index[eID] = row
+            if eID in self.pending_schedules:
+                self.register_schedule({"eID" : eID, "time-stmp" : self.pending_schedules.pop(eID)})
+        if self.max_pending_rows and len(self.buffer) > self.max_pending_rows: self.stream_rows()
+
+    def close_pending_events(self):
+        self.unmatched_commits += len(self.pending_commits)
+        self.pending_commits.clear()
+        self.pending_schedules.clear()
+        if self.unmatched_commits:
+            print("WARNING: {} commits without a matching schedule.".format(self.unmatched_commits))
+        if self.evicted:
+            print("WARNING: {} rows written before their commit, {} late events dropped.".format(len(self.evicted), self.late_events))
 
     def reduce_debug(self, line):
         if "Fetch:" in line:
-            self.iter_dict = self.get_instr_dict(line.split()[2:])
+            self.iter_dict = self.decode_fetch_line(line)
         elif " Instr " in line:
-            self.iter_dict["instr"] = line.split()[3][:-1].lower() # remove the trailing colon
+            self.iter_dict["instr"] = line.split(None, 4)[3][:-1].lower() # remove the trailing colon
             self.register_new_instruction()
         else:
             pass
 
-    def vx_trace_reduce_func(self, line):
-        if line.startswith("TRACE"):
-            self.reduce_trace(line)
-        elif line.startswith("DEBUG"):
-            self.reduce_debug(line)
+    # ------------------------ SHARDED DECODING ---------------- #
+    def get_shard(self, line):
+        m = VX_SHARD_RE.search(line)
+        if m is None: return None
+        return (int(m.group(1)) * 31 + int(m.group(2))) % self.n_workers
+
+    def start_workers(self):
+        # spawn would re-import the calling script (e.g. launch.py). The forked workers only touch their own queues,
+        # so the locks held by other threads of a multithreaded parent (launch.py thread pool) are never needed.
+        ctx = mp.get_context("fork")
+        self.shard_results = ctx.Queue()
+        self.shard_batches = [[] for _ in range(self.n_workers)]
+        self.shard_seqs = [[] for _ in range(self.n_workers)] # arrival number of the rows (Instr lines) of each batch
+        self.shard_seq = 0
+        self.last_shard = None
+        for shard in range(self.n_workers):
+            q = ctx.Queue(maxsize=8)
+            w = ctx.Process(target=vx_trace_shard_worker, args=(shard, q, self.shard_results), daemon=True)
+            w.start()
+            self.workers.append((w, q))
+
+    def check_worker(self, shard):
+        w = self.workers[shard][0]
+        if not w.is_alive(): raise RuntimeError("Trace shard worker {} died (exit code {}).".format(shard, w.exitcode))
+
+    def put_shard(self, shard, item):
+        """Queues item for the worker, waiting while its queue is full as long as the worker is alive."""
+        while True:
+            try:
+                self.workers[shard][1].put(item, timeout=self.WATCHDOG_PERIOD)
+                return
+            except queue.Full:
+                self.check_worker(shard)
+
+    def send_batch(self, shard):
+        self.put_shard(shard, (self.shard_batches[shard], self.shard_seqs[shard]))
+        self.shard_batches[shard] = []
+        self.shard_seqs[shard] = []
+
+    def shard_trace_line(self, line):
+        self.shard_line(self.get_shard(line), line)
+
+    def shard_debug_line(self, line):
+        """"Instr" lines carry no ids and follow their "Fetch" line."""
+        if "Fetch:" in line:
+            self.last_shard = self.get_shard(line)
+            self.shard_line(self.last_shard, line)
+        elif " Instr " in line:
+            # every Instr line makes a row: its arrival number restores the serial row order when merging
+            if self.last_shard is not None:
+                self.shard_seqs[self.last_shard].append(self.shard_seq)
+                self.shard_seq += 1
+            self.shard_line(self.last_shard, line)
+
+    def shard_line(self, shard, line):
+        """Routes the line to the worker owning its coreid/wid."""
+        if shard is None: return
+        self.shard_batches[shard].append(line)
+        if len(self.shard_batches[shard]) >= self.shard_batch_size: self.send_batch(shard)
+
+    def collect_shards(self):
+        """Returns the result of every worker, raises RuntimeError if a worker dies without one."""
+        results = {}
+        dead = set() # exited workers, given one more period for their result to be read
+        while len(results) < len(self.workers):
+            try:
+                shard, r = self.shard_results.get(timeout=self.WATCHDOG_PERIOD)
+                results[shard] = r
+                continue
+            except queue.Empty:
+                pass
+            for shard in set(range(len(self.workers))) - set(results):
+                if shard in dead: self.check_worker(shard)
+                if not self.workers[shard][0].is_alive(): dead.add(shard)
+        return [results[shard] for shard in range(len(self.workers))]
+
+    def stop_workers(self):
+        for w, _ in self.workers:
+            if w.is_alive(): w.terminate()
+            w.join()
+        self.workers = []
+
+    def merge_shards(self):
+        try:
+            for shard in range(len(self.workers)):
+                if self.shard_batches[shard]: self.send_batch(shard)
+                self.put_shard(shard, None)
+            results = self.collect_shards()
+        finally:
+            self.stop_workers()
+        errors = [r for r in results if isinstance(r, str)]
+        if errors: raise RuntimeError("Exception occured in a trace shard worker:\n" + errors[0])
+        tables = [r[0] for r in results]
+        self.unmatched_commits += sum(r[1] for r in results)
+        table = pa.concat_tables(tables).sort_by("seq")
+        return table.drop_columns(["seq"])
+    # ---------------------------------------------------------- #
 
     def run(self):
-        ret = super().run()
-        if ret == 0 or ret == 2:
+        return self.reduce_stream(super().run)
+
+    def replay(self, log_path : str):
+        """Rebuilds the trace from a saved log (e.g. after changing the reducers) instead of re-simulating."""
+        return self.reduce_stream(lambda: super(VortexTraceAnalysisClass, self).replay(log_path))
+
+    def reduce_stream(self, source):
+        """Runs source (the command or a replay) with the trace reduction set up around it, then saves the trace."""
+        if self.n_workers > 1: self.start_workers()
+        try:
+            ret = source()
+        finally:
+            table = self.merge_shards() if self.workers else None
+            self.close_pending_events()
+            if self.batch_size: self.close_stream()
+        if self.batch_size: return ret
+        self.df = self.buffer.to_df() if table is None else table.to_pandas()
+        if ret in (0, 2, self.TIMEOUT_RETCODE): # keep the partial trace of a killed run
             if not self.df.empty:
                 self.df.to_feather(self.output_file)
         return ret
 
+VX_LOG_NAMES = ("process.log", "run.log") # logs of a whole run, written before the per-experiment <result name>.log
+BLANK_LINE_RE = re.compile(r"\s*$")
+
+def strip_log_extensions(fname : str) -> str:
+    """<name>.log, <name>.log.gz or <name>.log.zst -> <name>, None for other files (and for the stderr logs)."""
+    for ext in LogWriterClass.EXTENSIONS.values():
+        if ext and fname.endswith(ext): fname = fname[:-len(ext)]
+    if not fname.endswith(".log") or fname.endswith(".stderr.log"): return None
+    return fname[:-len(".log")]
+
+def replay_trace_log(log_path : str, output_file : str = None, **kwargs):
+    """
+    Replays one saved Vortex log into <output_file>.feather. By default the log name without its extensions:
+    the experiment result name for the per-experiment logs of vortex-tan (<result name>.log), so the rebuilt trace
+    replaces the one the extraction reads; process/run for the logs of a whole run.
+    kwargs are passed to VortexTraceAnalysisClass (e.g. batch_size). Returns (log_path, retcode).
+    """
+    if output_file is None:
+        name = strip_log_extensions(os.path.basename(log_path)) or os.path.basename(log_path)
+        output_file = os.path.join(os.path.dirname(os.path.abspath(log_path)), name)
+    parser = VortexTraceAnalysisClass(output_file=output_file, exp=None, capture="off", **kwargs)
+    return log_path, parser.replay(log_path)
+
+def find_trace_logs(path : str):
+    """Returns the saved Vortex logs (<name>.log, plain or compressed, but not the stderr logs) found under path, or [path] for a file."""
+    if os.path.isfile(path): return [path]
+    logs = []
+    for root, _, files in os.walk(path):
+        for f in sorted(files):
+            if strip_log_extensions(f) is not None: logs.append(os.path.join(root, f))
+    return sorted(logs)
+
+def replay_trace_logs(path : str, n_workers : int = 1, **kwargs):
+    """
+    Replays every saved Vortex log under path (see find_trace_logs), n_workers logs at a time on a process pool.
+    Returns the list of (log_path, retcode), in the order of find_trace_logs.
+    """
+    logs = find_trace_logs(path)
+    if n_workers <= 1 or len(logs) <= 1:
+        return [replay_trace_log(l, **kwargs) for l in logs]
+    ctx = mp.get_context("fork") # spawn would re-import the calling script
+    with ctx.Pool(min(n_workers, len(logs))) as pool:
+        return pool.map(functools.partial(replay_trace_log, **kwargs), logs, chunksize=1)
+
+def vx_trace_shard_worker(shard, in_queue, out_queue):
+    """
+    Worker process of VortexTraceAnalysisClass sharded decoding.
+    Reduces the batches (lines, arrival numbers of their rows) received on in_queue until None, then puts
+    (shard, (table with the arrival numbers as "seq" column, unmatched commits)) on out_queue.
+    On an exception the traceback is put instead, and in_queue is still drained until None so the parent never blocks on it.
+    """
+    try:
+        reducer = VortexTraceAnalysisClass.make_shard_reducer()
+        seqs = []
+        for lines, batch_seqs in iter(in_queue.get, None):
+            for line in lines: reducer.parse_line(line)
+            seqs += batch_seqs
+        reducer.close_pending_events()
+        table = reducer.buffer.to_table()
+        if len(seqs) != table.num_rows: raise ValueError("{} rows for {} Instr lines.".format(table.num_rows, len(seqs)))
+        out_queue.put((shard, (table.append_column("seq", pa.array(seqs, type=pa.int64())), reducer.unmatched_commits)))
+    except Exception:
+        out_queue.put((shard, traceback.format_exc()))
+        for _ in iter(in_queue.get, None): pass
+
+DOTDUMP_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "swl-toolkit", "dotdump")
+DOTDUMP_CACHE_VERSION = 1 # bump when the parsing logic changes, older cache entries are then ignored
+DOTDUMP_FORMAT_RE = re.compile(r"^\S*elf:\s+file format (\S+)\s*$", re.MULTILINE)
+
 class DotDumpRISCVParsingClass(StreamParsingClass):
+    """
+    Child class of StreamParsingClass that parses an objdump disassembly (.dump) into one row per instruction
+    (PC-id, instr, func), saved as <output_path>/<dump name>.feather.
+    The dump is read in-process and the frame is built at once. Parsed tables are cached in cache_dir, keyed by
+    the content hash and file format of the dump (ELF32-riscv / elf32-littleriscv), so an unchanged dump is parsed once.
+    Constructor arguments:
+        dump_file : str     - path to the .dump file
+        cache_dir : str     - cache directory ("" disables the cache)
+    """
+    COLUMNS = ["PC-id", "instr", "func"]
+
     def __init__(self, output_path: str, timeout: int = 0,
-                    args: dict = {}, dump_file : str = ""):
+                    args: dict = {}, dump_file : str = "", cache_dir : str = DOTDUMP_CACHE_DIR):
         super().__init__(output_path, timeout)
         self.output_file = self.output_path + os.path.basename(dump_file) + ".feather"
         if args: self.cmd_arg_dict.update(args)
-        self.CMD_TEMPLATE = "cat {dump_file}"
-        self.exceptions_list = [self.is_out_of_code_section, self.is_function_name]
-        self.reduce_func = self.get_instruction_stats
+        self.set_line_rules([   (BLANK_LINE_RE,             None),
+                                ("Disassembly of section",  self.set_code_section),
+                                (self.is_out_of_code_section, None),
+                                (self.is_function_name,     None),
+                                ("",                        self.get_instruction_stats)])
 
         # ad-hoc attributes
         if dump_file == "": raise ValueError("Dump file not specified.")
         self.dump_file = dump_file
         self.cmd_arg_dict["dump_file"] = self.dump_file
+        self.cache_dir = cache_dir
 
         self.format = "ELF32-riscv"
         self.in_code_section = False
         self.func_name = "---"
-        self.iter_dict = {}
+        self.rows = []
         self.df = pd.DataFrame({})
 
+    @staticmethod
+    def get_dump_format(text):
+        m = DOTDUMP_FORMAT_RE.search(text)
+        return m.group(1) if m else "ELF32-riscv"
+
+    def get_cache_file(self, content : bytes, text : str):
+        if not self.cache_dir: return None
+        digest = hashlib.sha256(content).hexdigest()
+        return os.path.join(self.cache_dir, "{}-{}-v{}.feather".format(digest, self.get_dump_format(text), DOTDUMP_CACHE_VERSION))
+
+    def save_cache(self, cache_file):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_file = "{}.{}.tmp".format(cache_file, os.getpid())
+            self.df.to_feather(tmp_file)
+            os.replace(tmp_file, cache_file) # atomic, concurrent parsers of the same dump don't see partial files
+        except OSError as e:
+            print("Warning: could not cache the parsed dump in {}: {}".format(self.cache_dir, e))
+
+    def parse_dump(self):
+        with open(self.dump_file, "rb") as f:
+            content = f.read()
+        text = content.decode()
+        cache_file = self.get_cache_file(content, text)
+        if cache_file is not None and os.path.isfile(cache_file):
+            self.df = pd.read_feather(cache_file)
+            return
+        for line in text.splitlines(keepends=True): self.parse_line(line)
+        self.df = pd.DataFrame(self.rows, columns=self.COLUMNS)
+        self.rows = []
+        if cache_file is not None: self.save_cache(cache_file)
+
     def is_file_format(self, line):
         if not self.in_code_section:
             lline = line.strip().split()
@@ -366,17 +1187,13 @@ class DotDumpRISCVParsingClass(StreamParsingClass):
                     return True
         return False
 
+    def set_code_section(self, line):
+        self.in_code_section = (".text:" in line) or (".init:" in line)
+
     def is_out_of_code_section(self, line):
-        if line.strip() == "": return True
-        if self.is_file_format(line): return True
-        if line.startswith("Disassembly of section"):
-            if (".text:" in line) or (".init:" in line):
-                self.in_code_section = True
-                return True
-            else:
-                self.in_code_section = False
-                return True
-        return not self.in_code_section
+        if self.in_code_section: return False
+        self.is_file_format(line)
+        return True
         
     def is_function_name(self, line):
         if self.in_code_section:
@@ -397,18 +1214,19 @@ class DotDumpRISCVParsingClass(StreamParsingClass):
             return instr
         
     def get_instruction_stats(self, line):
-        lline = line.strip().split()
-        self.iter_dict["PC-id"] = "0x" + lline[0][:-1]
-        if self.format == "ELF32-riscv":            self.iter_dict["instr"] = self.remap_assembly(lline[5])
-        elif self.format == "elf32-littleriscv":    self.iter_dict["instr"] = self.remap_assembly(lline[2])
-        self.iter_dict["func"] = self.func_name
-        self.df = pd.concat([self.df, pd.DataFrame(self.iter_dict, index=[0])], ignore_index=True)
+        lline = line.split()
+        if self.format == "ELF32-riscv":            instr = self.remap_assembly(lline[5])
+        elif self.format == "elf32-littleriscv":    instr = self.remap_assembly(lline[2])
+        else: raise ValueError("Unsupported dump file format: {}".format(self.format))
+        self.rows.append(("0x" + lline[0][:-1], instr, self.func_name))
 
     def run(self):
-        ret = super().run()
-        if ret == 0:
-            self.df.to_feather(self.output_file)
-        return ret
+        try:
+            self.parse_dump()
+        except Exception as e:
+            return self.program_exception_handler(e)
+        self.df.to_feather(self.output_file)
+        return 0
     
     def get_df(self):
         r = self.run()
@@ -417,15 +1235,52 @@ class DotDumpRISCVParsingClass(StreamParsingClass):
         else:
             raise ValueError("Error while parsing the dump file.")
 
+def parse_dump_file(dump_file : str, output_path : str = "./", cache_dir : str = DOTDUMP_CACHE_DIR):
+    return DotDumpRISCVParsingClass(output_path=output_path, dump_file=dump_file, cache_dir=cache_dir).get_df()
+
+def parse_dump_files(dump_files : dict, output_path : str = "./", n_workers : int = 0, cache_dir : str = DOTDUMP_CACHE_DIR):
+    """
+    Parses several .dump files (kernel name -> dump path) on a process pool (n_workers processes, 0: one per CPU).
+    Returns a single table with the PC-id/instr/func rows of every dump, indexed by "kernel" (in dump_files order).
+    """
+    kernels = list(dump_files.keys())
+    if not kernels: return pd.DataFrame(columns=DotDumpRISCVParsingClass.COLUMNS, index=pd.Index([], name="kernel"))
+    n_workers = min(n_workers or os.cpu_count() or 1, len(kernels))
+    func = functools.partial(parse_dump_file, output_path=output_path, cache_dir=cache_dir)
+    if n_workers <= 1:
+        dfs = [func(dump_files[k]) for k in kernels]
+    else:
+        with mp.get_context("fork").Pool(n_workers) as pool: # spawn would re-import the calling script
+            dfs = pool.map(func, [dump_files[k] for k in kernels], chunksize=1)
+    return pd.concat(dfs, keys=kernels, names=["kernel", None]).droplevel(1)
+
 class AreaRptParsingClass(StreamParsingClass):
+    """
+    Child class of StreamParsingClass that parses a hierarchical area report (synthesis) down to depth (-1: full hierarchy).
+    The report is read in-process and stored in one pass as a flat, array-backed hierarchy in DFS order
+    (see AREA_SCHEMA: parent row index, depth and cell/net/total areas per instance).
+    df (one row per instance), leaf_df (instances without children, with their depth_<i> ancestor path) and the CSV
+    are derived from it at the end.
+    Outputs: <output_path>/<rpt name>.feather, <rpt name>_leaf.feather and <rpt name>_leaf.csv
+    """
+    AREA_SCHEMA = OrderedDict([ ("instance",    "U"),
+                                ("module",      "U"),
+                                ("parent_row",  "q"), # -1 for the top instance
+                                ("cell_count",  "q"),
+                                ("cell_area",   "d"),
+                                ("net_area",    "d"),
+                                ("total_area",  "d"),
+                                ("depth",       "q")])
+    DF_COLUMNS = ["instance", "module", "parent", "cell_count", "cell_area", "net_area", "total_area", "depth"]
+
     def __init__(self, output_path: str, timeout: int = 0,
                     args: dict = {}, rpt_file : str = "", depth : int = 0):
         super().__init__(output_path, timeout)
         self.output_file = self.output_path + os.path.basename(rpt_file) + ".feather"
         if args: self.cmd_arg_dict.update(args)
-        self.CMD_TEMPLATE = "cat {rpt_file}"
-        self.exceptions_list = [self.is_out_of_area_section, self.is_too_low_hierarchy]
-        self.reduce_func = self.get_area_stats
+        self.set_line_rules([   (self.is_out_of_area_section,   None),
+                                (self.is_too_low_hierarchy,     None),
+                                ("",                            self.get_area_stats)])
         
         # ad-hoc attributes
         if rpt_file == "": raise ValueError("RPT file not specified.")
@@ -434,13 +1289,10 @@ class AreaRptParsingClass(StreamParsingClass):
         self.cmd_arg_dict["rpt_file"] = self.rpt_file
         self.cmd_arg_dict["depth"] = self.depth
         self.in_area_section = False
-        self.iter_depth = -1
-        self.iter_parent_name = []
+        self.hierarchy = OrderedDict((k, [] if t == "U" else array.array(t)) for k, t in self.AREA_SCHEMA.items())
+        self.parent_rows = [] # row of the current ancestor at each depth
         self.df = pd.DataFrame({})
         self.leaf_df = pd.DataFrame({})
-        self.iter_dict = {}
-        self.iter_dict_prev = {"depth" : -1}
-
 
     def is_out_of_area_section(self, line):
         if self.in_area_section:
@@ -461,50 +1313,65 @@ class AreaRptParsingClass(StreamParsingClass):
         return False
 
     def get_area_stats(self, line):
+        lline = line.split()
+        if len(lline) == 6:     instance, module, numbers = lline[0], lline[1], lline[2:]
+        elif len(lline) == 5:   instance, module, numbers = lline[0], lline[0], lline[1:] # top instance
+        else: return # not an instance line
         depth = (len(line) - len(line.lstrip(' '))) // 2
-        lline = line.strip().split()
-        if len(lline) == 6:
-            self.iter_dict["instance"]      = lline[0]
-            self.iter_dict["module"]        = lline[1]
-            self.iter_dict["parent"]        = self.iter_parent_name[depth-1]
-            self.iter_dict["cell_count"]    = int(lline[2])
-            self.iter_dict["cell_area"]     = float(lline[3])
-            self.iter_dict["net_area"]      = float(lline[4])
-            self.iter_dict["total_area"]    = float(lline[5])
-            self.iter_dict["depth"]         = depth
-        elif len(lline) == 5:
-            self.iter_dict["instance"]      = lline[0]
-            self.iter_dict["module"]        = lline[0]
-            self.iter_dict["parent"]        = lline[0]
-            self.iter_dict["cell_count"]    = int(lline[1])
-            self.iter_dict["cell_area"]     = float(lline[2])
-            self.iter_dict["net_area"]      = float(lline[3])
-            self.iter_dict["total_area"]    = float(lline[4])
-            self.iter_dict["depth"]         = depth
-        self.df = pd.concat([self.df, pd.DataFrame(self.iter_dict, index=[0])], ignore_index=True)
-        self.make_leaf_df()
-        if depth > self.iter_depth:
-            self.iter_parent_name.append(self.iter_dict["instance"])
-            self.iter_depth += 1
-        elif depth < self.iter_depth:
-            for i in range(self.iter_depth - depth):
-                self.iter_parent_name.pop()
-            self.iter_parent_name[-1] = self.iter_dict["instance"]
-            self.iter_depth = depth
-        else:
-            self.iter_parent_name[-1] = self.iter_dict["instance"]
-    
-    def make_leaf_df(self):
-        if self.iter_dict["depth"] <= self.iter_dict_prev["depth"]:
-            for i in range(len(self.iter_parent_name)):
-                self.iter_dict_prev["depth_{}".format(i)] = self.iter_parent_name[i]
-            self.leaf_df = pd.concat([self.leaf_df, pd.DataFrame(self.iter_dict_prev, index=[0])], ignore_index=True)
-        self.iter_dict_prev = self.iter_dict.copy()
+        del self.parent_rows[depth:]
+        h = self.hierarchy
+        h["parent_row"].append(self.parent_rows[-1] if self.parent_rows else -1)
+        self.parent_rows.append(len(h["depth"]))
+        h["instance"].append(instance)
+        h["module"].append(module)
+        h["cell_count"].append(int(numbers[0]))
+        h["cell_area"].append(float(numbers[1]))
+        h["net_area"].append(float(numbers[2]))
+        h["total_area"].append(float(numbers[3]))
+        h["depth"].append(depth)
+
+    def get_hierarchy(self):
+        """Returns the parsed hierarchy as a DataFrame (AREA_SCHEMA columns, one row per instance in report order)."""
+        return pd.DataFrame({k : v if isinstance(v, list) else np.frombuffer(v, dtype=ColumnBufferClass.NUMPY_TYPES[self.AREA_SCHEMA[k]]).copy()
+                             for k, v in self.hierarchy.items()})
+
+    @staticmethod
+    def get_ancestor_rows(depth : np.ndarray):
+        """
+        For rows in DFS order, returns a (max depth + 1, rows) array with the row of the ancestor of each row at each
+        depth (the row itself at its own depth), -1 below the row depth.
+        """
+        rows = np.arange(len(depth))
+        ret = np.full((int(depth.max()) + 1 if len(depth) else 0, len(depth)), -1, dtype=np.int64)
+        for d in range(ret.shape[0]):
+            # the ancestor at depth d is the last row at depth d seen so far
+            ret[d] = np.maximum.accumulate(np.where(depth == d, rows, -1))
+            ret[d][depth < d] = -1
+        return ret
+
+    def make_df(self, h : pd.DataFrame):
+        parent_row = h["parent_row"].to_numpy()
+        instance = h["instance"].to_numpy(dtype=object)
+        df = h.drop(columns="parent_row")
+        df.insert(2, "parent", np.where(parent_row >= 0, instance[np.maximum(parent_row, 0)], instance))
+        return df[self.DF_COLUMNS]
 
+    def make_leaf_df(self, df : pd.DataFrame):
+        depth = df["depth"].to_numpy()
+        is_leaf = np.ones(len(depth), dtype=bool)
+        is_leaf[:-1] = depth[1:] <= depth[:-1] # in DFS order, a row has children iff the next row is deeper
+        leaf_df = df[is_leaf].reset_index(drop=True)
+        ancestors = self.get_ancestor_rows(depth)[:, is_leaf]
+        instance = df["instance"].to_numpy(dtype=object)
+        for d in range(ancestors.shape[0]):
+            leaf_df["depth_{}".format(d)] = np.where(ancestors[d] >= 0, instance[ancestors[d]], None)
+        return leaf_df
 
     def run(self):
-        ret = super().run()
+        ret = self.replay(self.rpt_file)
         if ret == 0:
+            self.df = self.make_df(self.get_hierarchy())
+            self.leaf_df = self.make_leaf_df(self.df)
             self.df.to_feather(self.output_file)
             self.leaf_df.to_feather(self.output_file.replace(".feather", "_leaf.feather"))
             self.leaf_df.to_csv(self.output_file.replace(".feather", "_leaf.csv"))
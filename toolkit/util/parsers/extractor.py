@@ -13,12 +13,18 @@ class ExtractorParserClass(ScriptsParserClass):
         self.parser.add_argument("-o", "--output_dir", action="store", type=str, help="Output direcory for the results.")
         self.parser.add_argument("-a", "--app", action="store", type=str, help="C application to run the experiment on.")
         self.parser.add_argument("-f", "--yml_file", action="store", type=str, help="YML file with the experiment database.")
+        self.parser.add_argument("-j", "--workers", action="store", type=int, help="Number of processes extracting the experiment reports.")
+        self.parser.add_argument("--incremental", action="store_true", help="Only extract new or changed reports (see dataframe.manifest.feather).")
+        self.parser.add_argument("--partition_by", action="store", type=str, nargs="+", help="Write a Parquet dataset partitioned by these parameters (e.g. app cores warps).")
+        self.set_defaults()
     
     def set_defaults(self):
         self.parser.set_defaults(mode="")
         self.parser.set_defaults(output_dir="")
         self.parser.set_defaults(app=None)
         self.parser.set_defaults(yml_file='')
+        self.parser.set_defaults(workers=1)
+        self.parser.set_defaults(partition_by=None)
 
     def reduce_args(self):
         if self.args.app is None:
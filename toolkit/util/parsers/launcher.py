@@ -28,6 +28,13 @@ class LauncherParserClass(ScriptsParserClass):
         self.parser.add_argument("--dry_run", action="store_true", help="Prints the experiment book without running it.")
         self.parser.add_argument("--lock_on_first", action="store_true", help="Locks the launcher on the first experiment to finish.")
         self.parser.add_argument("--force_flat_execution", action="store_true", help="Disables the lock on the launcher.")
+        self.parser.add_argument("--trace_batch_size", action="store", type=int, help="vortex-tan: stream the trace to the .feather file in record batches of this size (0: write at the end).")
+        self.parser.add_argument("--trace_max_pending_rows", action="store", type=int, help="vortex-tan: with --trace_batch_size, write the oldest rows without their commit beyond this many buffered rows (0: no cap).")
+        self.parser.add_argument("--trace_workers", action="store", type=int, help="vortex-tan: number of processes decoding each trace, split by core/warp.")
+        self.parser.add_argument("--trace_timeout", action="store", type=int, help="vortex-tan: wall-clock limit of each simulation in seconds (0: none).")
+        self.parser.add_argument("--trace_idle_timeout", action="store", type=int, help="vortex-tan: kill a simulation printing nothing for this many seconds (0: none).")
+        self.parser.add_argument("--trace_capture", action="store", type=str, choices=["all", "filtered", "off"], help="vortex-tan: raw simulator output kept in <result name>.log, one per experiment (all: needed by replay-traces.py, filtered: drop DEBUG/TRACE lines).")
+        self.parser.add_argument("--trace_log_compression", action="store", type=str, choices=["gzip", "zstd", "none"], help="vortex-tan: compression of <result name>.log (default: gzip, a raw log is about the size of the trace).")
         self.set_defaults()
 
     def set_defaults(self):
@@ -39,6 +46,13 @@ class LauncherParserClass(ScriptsParserClass):
         self.parser.set_defaults(dry_run=False)
         self.parser.set_defaults(lock_on_first=False)
         self.parser.set_defaults(force_flat_execution=False)
+        self.parser.set_defaults(trace_batch_size=0)
+        self.parser.set_defaults(trace_max_pending_rows=0)
+        self.parser.set_defaults(trace_workers=1)
+        self.parser.set_defaults(trace_timeout=0)
+        self.parser.set_defaults(trace_idle_timeout=0)
+        self.parser.set_defaults(trace_capture="all")
+        self.parser.set_defaults(trace_log_compression="gzip")
 
     def reduce_args(self):
         """--conf_file"""
@@ -54,6 +68,8 @@ class LauncherParserClass(ScriptsParserClass):
 
         if self.args.oID:
             self.dispatch = True
+
+        if self.args.trace_log_compression == "none": self.args.trace_log_compression = None
         
         for a in vars(self.args):
             if getattr(self.args, a) is not None:
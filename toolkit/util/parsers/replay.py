@@ -0,0 +1,29 @@
+import os
+
+from .script import ScriptsParserClass
+
+class ReplayParserClass(ScriptsParserClass):
+    def __init__(self, args=None):
+        super(ReplayParserClass, self).__init__(args)
+
+    def init_parser(self):
+        self.parser.add_argument("-i", "--input", action="store", type=str, help="Saved simx log (<result name>.log, plain or compressed) or directory of logs.")
+        self.parser.add_argument("-o", "--output", action="store", type=str, help="Output trace of a single log, without the .feather extension (default: the log name, i.e. the experiment result name).")
+        self.parser.add_argument("-j", "--workers", action="store", type=int, help="Number of logs replayed in parallel.")
+        self.parser.add_argument("--trace_batch_size", action="store", type=int, help="Stream the trace to the .feather file in record batches of this size (0: write at the end).")
+        self.parser.add_argument("--trace_max_pending_rows", action="store", type=int, help="With --trace_batch_size, write the oldest rows without their commit beyond this many buffered rows (0: no cap).")
+        self.set_defaults()
+
+    def set_defaults(self):
+        self.parser.set_defaults(input=".")
+        self.parser.set_defaults(workers=1)
+        self.parser.set_defaults(output=None)
+        self.parser.set_defaults(trace_batch_size=0)
+        self.parser.set_defaults(trace_max_pending_rows=0)
+
+    def check_args(self):
+        if not os.path.exists(self.args.input): raise FileNotFoundError(self.args.input)
+        if self.args.output and not os.path.isfile(self.args.input): raise ValueError("--output needs a single log as input.")
+
+    def reduce_args(self):
+        pass